@@ -0,0 +1,114 @@
+"""Check download host selection against local stand-in hosts.
+
+Run from the repository root in an environment with Home Assistant installed:
+
+    python benchmarks/download_hosts.py [speed ...]
+
+Every speed (in MiB/s) starts a local HTTP server that serves a file with
+Range support at that rate. The selector probes all of them and the host it
+picks is downloaded from and compared with the slowest one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.terabox.endpoints import (  # noqa: E402
+    DownloadHostSelector,
+    replace_host,
+)
+
+FILE_SIZE = 32 * 1024 * 1024
+BLOCK_SIZE = 64 * 1024
+DEFAULT_SPEEDS = (2.0, 8.0, 32.0)  # MiB/s
+
+
+def make_app(speed: float) -> web.Application:
+    """Return an app serving /file at the given speed in MiB/s."""
+    delay = BLOCK_SIZE / (speed * 1024 * 1024)
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        start, end = 0, FILE_SIZE - 1
+        if request.http_range.start is not None:
+            start = request.http_range.start
+            end = min(end, (request.http_range.stop or FILE_SIZE) - 1)
+        resp = web.StreamResponse(status=206 if request.headers.get("Range") else 200)
+        resp.content_length = end - start + 1
+        await resp.prepare(request)
+        remaining = end - start + 1
+        while remaining:
+            block = min(remaining, BLOCK_SIZE)
+            await resp.write(b"\0" * block)
+            remaining -= block
+            await asyncio.sleep(delay)
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/file", handler)
+    return app
+
+
+async def download(session: ClientSession, url: str) -> float:
+    """Download a URL and return the time it took."""
+    started = time.monotonic()
+    async with session.get(url) as resp:
+        async for _ in resp.content.iter_chunked(BLOCK_SIZE):
+            pass
+    return time.monotonic() - started
+
+
+async def main(speeds: list[float]) -> None:
+    """Start stand-in hosts, select one and compare download times."""
+    runners = []
+    hosts = {}
+    for speed in speeds:
+        runner = web.AppRunner(make_app(speed))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        hosts[f"127.0.0.1:{port}"] = speed
+        runners.append(runner)
+
+    try:
+        async with ClientSession() as session:
+
+            async def request(url: str, headers: dict[str, str]):
+                return await session.get(url, headers=headers)
+
+            selector = DownloadHostSelector(request)
+            selector.add_hosts(hosts)
+            link = f"http://{next(iter(hosts))}/file?sign=test"
+            started = time.monotonic()
+            fast_url = await selector.async_select(link)
+            probe_time = time.monotonic() - started
+
+            for host, score in selector.scores.items():
+                print(
+                    f"{host:>22}  {hosts[host]:6.1f} MiB/s simulated  "
+                    f"{(score.throughput or 0) / 1024 / 1024:6.1f} MiB/s probed  "
+                    f"{(score.latency or 0) * 1000:6.1f} ms latency"
+                )
+            slowest = min(hosts, key=hosts.get)
+            fast_time = await download(session, fast_url)
+            slow_time = await download(session, replace_host(link, slowest))
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+    selected = fast_url.split("/")[2]
+    print(f"probes took {probe_time:.2f}s, selected {selected}")
+    print(f"download from selected host {fast_time:.2f}s, slowest host {slow_time:.2f}s")
+    if hosts[selected] != max(hosts.values()):
+        sys.exit("the fastest host was not selected")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([float(arg) for arg in sys.argv[1:]] or list(DEFAULT_SPEEDS)))
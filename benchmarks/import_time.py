@@ -0,0 +1,62 @@
+"""Measure import time of the Terabox integration.
+
+Run from the repository root in an environment with Home Assistant installed:
+
+    python benchmarks/import_time.py [module ...]
+
+Every module is imported in a fresh interpreter with ``-X importtime``.
+Home Assistant core is imported first, it is always loaded when the
+integration is, so only the integration's own cost is reported.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = (
+    "custom_components.terabox",
+    "custom_components.terabox.config_flow",
+    "custom_components.terabox.backup",
+)
+# Dependencies that should only be imported on the first transfer
+LAZY = ("aioterabox", "aiofiles", "cryptography", "numpy")
+PRELOAD = "import homeassistant.core, homeassistant.helpers.aiohttp_client"
+
+
+def measure(module: str) -> tuple[int, list[str]]:
+    """Return cumulative import time in microseconds and lazy modules loaded."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{PRELOAD}\nimport {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header
+        name = name.strip()
+        if name == module:
+            total = int(cumulative)
+        if name.split(".")[0] in LAZY:
+            loaded.add(name.split(".")[0])
+    return total, sorted(loaded)
+
+
+def main() -> None:
+    """Print import time of each module."""
+    for module in sys.argv[1:] or MODULES:
+        total, loaded = measure(module)
+        print(f"{module:45} {total / 1000:8.1f} ms  eager: {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,11 @@ from __future__ import annotations
 
 import logging
 from collections.abc import Callable
+from pathlib import Path
 
 # from aioterabox.exceptions import TeraboxApiError
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
 # from homeassistant.exceptions import ConfigEntryNotReady
 # from homeassistant.helpers import instance_id
@@ -16,11 +17,26 @@ from homeassistant.core import HomeAssistant
 #     OAuth2Session,
 #     async_get_config_entry_implementation,
 # )
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.typing import ConfigType
 from homeassistant.util.hass_dict import HassKey
 
 from .api import TeraboxClient
-from .const import CONF_BACKUP_LOCATION, DOMAIN
+from .cache import CACHE_FOLDER, TeraboxDownloadCache, remove_cache
+from .const import (
+    CONF_BACKUP_LOCATION,
+    CONF_CACHE_SIZE,
+    CONF_UPLOAD_WORKERS,
+    DEFAULT_UPLOAD_WORKERS,
+    DOMAIN,
+    WARM_UP_BACKUPS,
+)
+from .cookie_store import TeraboxCookieStore
 from .coordinator import TeraboxConfigEntry, TeraboxDataUpdateCoordinator
+from .forecast import UsageHistory
+from .services import async_setup_services
+from .upload_queue import TeraboxUploadQueue
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,30 +46,82 @@ DATA_BACKUP_AGENT_LISTENERS: HassKey[list[Callable[[], None]]] = HassKey(
 
 PLATFORMS = (Platform.SENSOR,)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Terabox services."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: TeraboxConfigEntry) -> bool:
     """Set up Terabox from a config entry."""
 
+    cookie_store = TeraboxCookieStore(hass, entry.entry_id)
+    # Cookies entered in the config flow are used until they are rotated
+    cookies = await cookie_store.async_load() or entry.options or None
+    download_cache = None
+    if cache_size := entry.data.get(CONF_CACHE_SIZE):
+        download_cache = TeraboxDownloadCache(
+            hass, entry.entry_id, cache_size * 1024 * 1024
+        )
+        await download_cache.async_load()
     client = TeraboxClient(
         hass,
         config_entry=entry,
         email=entry.data[CONF_EMAIL],
         password=entry.data[CONF_PASSWORD],
-        cookies=entry.options if entry.options else None,
+        cookies=cookies,
+        cookie_store=cookie_store,
+        download_cache=download_cache,
     )
-    await client.login()
+    # Saved cookies are validated by the first real API call, the client
+    # logs in on demand when Terabox rejects them
+
+    upload_queue = TeraboxUploadQueue(
+        hass,
+        client,
+        entry.entry_id,
+        workers=entry.data.get(CONF_UPLOAD_WORKERS, DEFAULT_UPLOAD_WORKERS),
+    )
+    await upload_queue.async_load()
+    upload_queue.start(
+        lambda coro, name: entry.async_create_background_task(hass, coro, name)
+    )
+
+    usage_history = UsageHistory(hass, entry.entry_id)
+    await usage_history.async_load()
 
     coordinator = TeraboxDataUpdateCoordinator(
         hass,
         client=client,
+        upload_queue=upload_queue,
+        usage_history=usage_history,
         backup_location=entry.data[CONF_BACKUP_LOCATION],
         config_entry=entry,
     )
     entry.runtime_data = coordinator
-    # Query the device for the first time and initialise coordinator.data
-    await coordinator.async_config_entry_first_refresh()
+    # Don't make setup wait for Terabox, sensors stay unavailable until the
+    # first refresh completes in the background
+    entry.async_create_background_task(
+        hass, coordinator.async_initial_refresh(), f"{DOMAIN}_first_refresh"
+    )
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    @callback
+    def async_start_warm_up(hass: HomeAssistant) -> None:
+        # Background tasks of the entry are cancelled on unload
+        entry.async_create_background_task(
+            hass, client.async_warm_up(WARM_UP_BACKUPS), f"{DOMAIN}_warm_up"
+        )
+        # Local backups are only listed once the backup integration is set up
+        entry.async_create_background_task(
+            hass, upload_queue.async_resume(), f"{DOMAIN}_resume_uploads"
+        )
+
+    entry.async_on_unload(async_at_started(hass, async_start_warm_up))
     # entry.async_on_unload(entry.add_update_listener(update_listener))
 
     def async_notify_backup_listeners() -> None:
@@ -72,3 +140,13 @@ async def async_unload_entry(
     await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: TeraboxConfigEntry) -> None:
+    """Remove stored data and cached backups of a removed config entry."""
+    await TeraboxCookieStore(hass, entry.entry_id).async_remove()
+    await TeraboxUploadQueue.async_remove(hass, entry.entry_id)
+    await UsageHistory.async_remove(hass, entry.entry_id)
+    await hass.async_add_executor_job(
+        remove_cache, Path(hass.config.path(CACHE_FOLDER)), entry.entry_id
+    )
@@ -2,19 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import importlib
 import json
 import logging
+import os
+import time
 from collections.abc import AsyncIterator, Callable, Coroutine
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any
 
-import aiofiles
 from aiohttp import ClientResponse
 from aiohttp.client_exceptions import ClientError, ClientResponseError
-from aioterabox.api import TeraboxClient as TeraboxApiClient
-from aioterabox.exceptions import TeraboxApiError, TeraboxNotFoundError
-from homeassistant.components.backup import AgentBackup, suggested_filename
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import (
     ConfigEntryAuthFailed,
@@ -23,14 +25,128 @@ from homeassistant.exceptions import (
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import CONF_BACKUP_LOCATION
+from .cache import TeraboxDownloadCache
+from .chunker import ContentDefinedChunker, chunk_digest
+from .const import (
+    CHUNKS_FOLDER,
+    CONF_BACKUP_LOCATION,
+    CONF_STORAGE_MODE,
+    CONF_VOLUME_SIZE,
+    DEFAULT_VOLUME_SIZE,
+    DOMAIN,
+    DOWNLOAD_DOMAINS,
+    MIN_VOLUME_SIZE,
+    STORAGE_MODE_DEDUP,
+    STORAGE_MODE_FILE,
+    STORAGE_MODE_VOLUMES,
+)
+from .cookie_store import TeraboxCookieStore
+from .endpoints import DownloadHostSelector
+from .exceptions import TeraboxError, TeraboxNotFound
+from .tuning import AdaptiveSize
+
+if TYPE_CHECKING:
+    # aioterabox, aiofiles and backup are only needed for transfers, they are
+    # imported on the first API call to keep integration setup fast
+    from aioterabox.api import FileInfo, TeraboxClient as TeraboxApiClient
+    from homeassistant.components.backup import AgentBackup
 
 _UPLOAD_AND_DOWNLOAD_TIMEOUT = 12 * 3600
 _UPLOAD_MAX_RETRIES = 20
+# Files up to this size are uploaded by aioterabox as a single block, so the
+# MD5 reported by Terabox is the MD5 of the content. For larger files it is
+# derived from the block list and can't be compared with the content hash.
+_SINGLE_BLOCK_MAX_SIZE = 10 * 1024 * 1024
+# Number of files to resolve in a single get_files_meta request
+_FILES_META_BATCH = 100
+# Volumes transferred at the same time, each one is spooled to a temp file
+_VOLUME_CONCURRENCY = 2
+_VOLUME_MAX_ATTEMPTS = 3
+_READ_CHUNK_SIZE = 1024 * 1024
+# Download reads are tuned to about 20 reads per second
+_READ_CHUNK_MIN_SIZE = 64 * 1024
+_READ_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+_READ_CHUNK_DURATION = 0.05
+# Volumes are whole Terabox upload blocks, tuned to upload in about 5 minutes
+_UPLOAD_BLOCK_SIZE = 4 * 1024 * 1024
+_VOLUME_UPLOAD_DURATION = 5 * 60
+# Largest page the Terabox list API returns
+_LIST_PAGE_SIZE = 1000
+# Download links stay valid for several hours, refresh them well before
+_DLINK_TTL = 30 * 60
+# Downloads from this size on go to the fastest download host
+_FAST_HOST_MIN_SIZE = 64 * 1024 * 1024
+# Pause between warm-up requests to leave the API to foreground calls
+_WARM_UP_DELAY = 2
+# Added to the names of a backup while its replacement uploads
+_REPLACED_SUFFIX = ".replaced"
 
 _LOGGER = logging.getLogger(__name__)
 
 
+async def async_read_chunk(resp: ClientResponse, size: int) -> bytes:
+    """Read ``size`` bytes of a response, less only at its end.
+
+    ``StreamReader.read`` returns what is buffered, at most a few hundred
+    KiB, so a tuned size has to be collected over several reads.
+    """
+    try:
+        return await resp.content.readexactly(size)
+    except asyncio.IncompleteReadError as err:
+        return err.partial
+
+
+async def _async_list_page(
+    api: TeraboxApiClient, remote_dir: str, page: int, page_size: int
+) -> list[FileInfo]:
+    """Return a single page of a remote directory listing.
+
+    aioterabox only ever requests the first page, so call the list API here.
+    """
+    from aioterabox.api import BASE_TERABOX_URL, FileInfo
+    from aioterabox.exceptions import (
+        TeraboxApiError,
+        TeraboxNotFoundError,
+        TeraboxUnauthorizedError,
+    )
+
+    async with api._request(
+        "GET",
+        f"{BASE_TERABOX_URL}/api/list",
+        params={
+            "app_id": "250528",
+            "web": "1",
+            "channel": "dubox",
+            "clienttype": "5",
+            "jsToken": api.js_token,
+            "dir": f"/{remote_dir.lstrip('/')}",
+            "num": str(page_size),
+            "page": str(page),
+            "order": "name",
+            "desc": "0",
+            "showempty": "0",
+        },
+        timeout=10,
+    ) as response:
+        data = await response.json()
+    errno = data.get("errno", 0)
+    if errno in {-7, -9}:
+        raise TeraboxNotFoundError("Remote directory not found.")
+    if errno == -6:
+        raise TeraboxUnauthorizedError("Invalid cookies.")
+    if errno != 0:
+        raise TeraboxApiError(f"API error: {data}")
+    return [
+        FileInfo(
+            name=entry["server_filename"],
+            path=entry["path"],
+            size=entry["size"],
+            is_dir=entry["isdir"],
+        )
+        for entry in data.get("list", [])
+    ]
+
+
 @dataclass
 class StorageQuotaData:
     """Class to represent storage quota data."""
@@ -48,6 +164,23 @@ class BackupMetadata:
     file_path: str
     metadata: dict[str, str | dict[str, list[str]]]
     metadata_file: str
+    size: int | None = None
+    md5: str | None = None
+    storage_mode: str = STORAGE_MODE_FILE
+    chunks: list[str] | None = None
+    volumes: list[dict[str, Any]] | None = None
+
+
+def _is_file(file: FileInfo) -> bool:
+    return not file.is_dir
+
+
+def _is_metadata_file(file: FileInfo) -> bool:
+    return not file.is_dir and file.name.endswith(".metadata.json")
+
+
+def _is_replaced_metadata_file(file: FileInfo) -> bool:
+    return not file.is_dir and file.name.endswith(".metadata.json" + _REPLACED_SUFFIX)
 
 
 class TeraboxClient:
@@ -61,20 +194,48 @@ class TeraboxClient:
         email: str,
         password: str,
         cookies: dict[str, Any] | None = None,
+        cookie_store: TeraboxCookieStore | None = None,
+        download_cache: TeraboxDownloadCache | None = None,
     ) -> None:
         """Initialize Terabox client."""
         # self._ha_instance_id = ha_instance_id
         self.hass = hass
         self.config_entry = config_entry
+        self._cookie_store = cookie_store
+        self.download_cache = download_cache
         self._email = email
         self._password = password
         self._initial_cookies = cookies
+        # Saved cookies are trusted until Terabox rejects them,
+        # counts logins to skip the ones made obsolete by a concurrent call
+        self._login_generation = 0
+        self._login_lock = asyncio.Lock()
         self._session = async_get_clientsession(hass)
-        self._api = TeraboxApiClient(
-            email=self._email,
-            password=self._password,
-            session=self._session,
-            cookies=cookies,
+        self._api_client: TeraboxApiClient | None = None
+        # Serializes dedup uploads with chunk garbage collection
+        self._chunks_lock = asyncio.Lock()
+        # Metadata files never change once uploaded, keyed by remote path
+        self._metadata_cache: dict[str, BackupMetadata] = {}
+        # Remote path -> (dlink, time it was resolved)
+        self._dlink_cache: dict[str, tuple[str, float]] = {}
+        self.download_hosts = DownloadHostSelector(
+            self._async_request_download, domains=DOWNLOAD_DOMAINS
+        )
+        # Larger reads save wakeups on fast links, smaller volumes are cheaper
+        # to retry on lossy ones
+        self.download_chunk_size = AdaptiveSize(
+            initial=_READ_CHUNK_SIZE,
+            minimum=_READ_CHUNK_MIN_SIZE,
+            maximum=_READ_CHUNK_MAX_SIZE,
+            align=_READ_CHUNK_MIN_SIZE,
+            target_duration=_READ_CHUNK_DURATION,
+        )
+        self.volume_upload_size = AdaptiveSize(
+            initial=self.volume_size,
+            minimum=MIN_VOLUME_SIZE * 1024 * 1024,
+            maximum=self.volume_size,
+            align=_UPLOAD_BLOCK_SIZE,
+            target_duration=_VOLUME_UPLOAD_DURATION,
         )
 
     @property
@@ -82,12 +243,54 @@ class TeraboxClient:
         """Return the email address."""
         return self._email
 
+    @property
+    def _api(self) -> TeraboxApiClient:
+        """Return the Terabox API client loaded by _async_load_api."""
+        if self._api_client is None:
+            raise TeraboxError("Terabox API is not loaded")
+        return self._api_client
+
+    async def _async_load_api(self) -> TeraboxApiClient:
+        """Import aioterabox and create the API client on first use."""
+        if self._api_client is None:
+            module = await self.hass.async_add_import_executor_job(
+                importlib.import_module, "aioterabox.api"
+            )
+            self._api_client = module.TeraboxClient(
+                email=self._email,
+                password=self._password,
+                session=self._session,
+                cookies=self._initial_cookies,
+            )
+        return self._api_client
+
     @property
     def account_id(self) -> str | None:
         """Return the account ID."""
-        if not self._api.account:
-            raise TeraboxApiError("Account information not loaded")
-        return str(self._api.account['account_id'])
+        if self._api_client and self._api_client.account['account_id'] is not None:
+            return str(self._api_client.account['account_id'])
+        # Known from the config entry before the session is validated
+        if self.config_entry and self.config_entry.unique_id:
+            return self.config_entry.unique_id.removeprefix('terabox_')
+        raise TeraboxError("Account information not loaded")
+
+    @property
+    def account_key(self) -> str:
+        """Return the key referring to this account in backup manifests."""
+        if self.config_entry and self.config_entry.unique_id:
+            return self.config_entry.unique_id
+        return ''
+
+    def _client_for_account(self, account_key: str | None) -> TeraboxClient:
+        """Return the client of another loaded Terabox account."""
+        if not account_key or account_key == self.account_key:
+            return self
+        entry = self.hass.config_entries.async_entry_for_domain_unique_id(
+            DOMAIN, account_key
+        )
+        if entry is None or entry.state is not ConfigEntryState.LOADED:
+            raise HomeAssistantError(f"Terabox account {account_key} is not loaded")
+        return entry.runtime_data.client
 
     @property
     def backup_location(self) -> str:
@@ -96,11 +299,42 @@ class TeraboxClient:
             return f'/{self.config_entry.data[CONF_BACKUP_LOCATION].strip("/")}'
         return ''
 
+    @property
+    def storage_mode(self) -> str:
+        """Return the storage mode of new backups."""
+        if self.config_entry:
+            return self.config_entry.data.get(CONF_STORAGE_MODE, STORAGE_MODE_FILE)
+        return STORAGE_MODE_FILE
+
+    @property
+    def volume_size(self) -> int:
+        """Return the size of a volume in bytes."""
+        size = DEFAULT_VOLUME_SIZE
+        if self.config_entry:
+            size = self.config_entry.data.get(CONF_VOLUME_SIZE, DEFAULT_VOLUME_SIZE)
+        return int(size) * 1024 * 1024
+
+    def volumes_location(self, backup_id: str) -> str:
+        """Return the folder with volumes of a backup."""
+        return f"{self.backup_location}/{backup_id}"
+
+    @property
+    def chunks_location(self) -> str:
+        """Return the location of the dedup chunk store."""
+        return f"{self.backup_location}/{CHUNKS_FOLDER}"
+
     async def login(self) -> None:
         """Login to Terabox."""
+        api = await self._async_load_api()
+        from aioterabox.exceptions import TeraboxApiError, TeraboxUnauthorizedError
+
         try:
-            await self._api.login()
-            await self._api.get_account_id()
+            await api.login()
+            await api.get_account_id()
+        except TeraboxUnauthorizedError as err:
+            raise ConfigEntryAuthFailed("Invalid authentication") from err
+        except TeraboxApiError as err:
+            raise ConfigEntryNotReady(f"Unable to login to Terabox: {err}") from err
         except ClientResponseError as err:
             if err.status == 401:
                 raise ConfigEntryAuthFailed("Invalid authentication") from err
@@ -108,16 +342,90 @@ class TeraboxClient:
         except ClientError as err:
             raise ConfigEntryNotReady("Unable to connect to Terabox") from err
 
-        # Save cookies
-        if self.config_entry:
-            options = dict(self.config_entry.options or {})
-            # options.update({'cookies': self._api._cookies})
-            options.update(self._api._cookies)
-            self.hass.config_entries.async_update_entry(self.config_entry, options=options)
+        self._persist_cookies()
+        self._login_generation += 1
+
+    def _persist_cookies(self) -> None:
+        """Save cookies if Terabox rotated them."""
+        if self._cookie_store and self._api_client:
+            self._cookie_store.async_save_if_changed(dict(self._api_client._cookies))
+
+    async def _async_relogin(self, generation: int) -> None:
+        """Login once, even when several calls fail at the same time."""
+        async with self._login_lock:
+            if generation != self._login_generation:
+                return
+            try:
+                await self.login()
+            except ConfigEntryNotReady as err:
+                # Raised for setup, at runtime it is a failed API call
+                raise TeraboxError(str(err)) from err
+
+    async def _async_session_expired(self, api: TeraboxApiClient) -> bool:
+        """Return if Terabox rejects the current session."""
+        from aioterabox.exceptions import TeraboxApiError, TeraboxUnauthorizedError
+
+        try:
+            await api.ensure_logged_in()
+        except TeraboxUnauthorizedError:
+            return True
+        except (TeraboxApiError, ClientError, TimeoutError) as err:
+            _LOGGER.debug("Unable to check the Terabox session: %s", err)
+        return False
+
+    async def _call(
+        self, method: str | Callable[..., Coroutine[Any, Any, Any]], *args: Any
+    ) -> Any:
+        """Call Terabox API method, logging in on the first auth error.
+
+        method is either a name of an aioterabox client method or a function
+        taking the aioterabox client as the first argument.
+        aioterabox errors are raised as TeraboxError.
+        """
+        api = await self._async_load_api()
+        from aioterabox.exceptions import (
+            TeraboxApiError,
+            TeraboxNotFoundError,
+            TeraboxUnauthorizedError,
+        )
+
+        generation = self._login_generation
+        if self._initial_cookies is None and generation == 0:
+            await self._async_relogin(generation)
+            generation = self._login_generation
+        if isinstance(method, str):
+            call = getattr(api, method)
+        else:
+            call = functools.partial(method, api)
+        try:
+            try:
+                return await call(*args)
+            except TeraboxUnauthorizedError:
+                _LOGGER.debug("Session rejected by Terabox, logging in")
+            except TeraboxNotFoundError:
+                raise
+            except TeraboxApiError as err:
+                # Quota, file meta and file manager calls report an expired
+                # session as a plain API error, check the session to tell
+                if (
+                    generation == self._login_generation
+                    and not await self._async_session_expired(api)
+                ):
+                    raise
+                _LOGGER.debug("Session expired (%s), logging in", err)
+            await self._async_relogin(generation)
+            return await call(*args)
+        except TeraboxNotFoundError as err:
+            raise TeraboxNotFound(str(err)) from err
+        except TeraboxApiError as err:
+            raise TeraboxError(str(err)) from err
+        finally:
+            # Cookies rotate on logins and uploads
+            self._persist_cookies()
 
     async def async_get_storage_quota(self) -> StorageQuotaData:
         """Get storage quota of the current user."""
-        res = await self._api.get_storage_quota()
+        res = await self._call("get_storage_quota")
 
         limit = res.get("total")
         return StorageQuotaData(
@@ -127,142 +435,903 @@ class TeraboxClient:
 
     async def async_create_ha_root_folder_if_not_exists(self) -> tuple[str, str]:
         """Create Home Assistant folder if it doesn't exist."""
+        return await self._async_create_folder_if_not_exists(self.backup_location)
+
+    async def async_iter_directory(
+        self,
+        path: str,
+        predicate: Callable[[FileInfo], bool] | None = None,
+    ) -> AsyncIterator[FileInfo]:
+        """Iterate over a remote directory page by page.
+
+        Pages are requested as the caller consumes entries, so breaking out
+        of the loop skips the remaining pages.
+
+        :param predicate: Yield only entries it returns True for.
+        :raises TeraboxNotFound: if the directory doesn't exist.
+        """
+        page = 1
+        while True:
+            entries = await self._call(_async_list_page, path, page, _LIST_PAGE_SIZE)
+            for entry in entries:
+                if predicate is None or predicate(entry):
+                    yield entry
+            if len(entries) < _LIST_PAGE_SIZE:
+                return
+            page += 1
+
+    async def _async_create_folder_if_not_exists(self, path: str) -> tuple[str, str]:
         try:
-            await self._api.list_remote_directory(self.backup_location)
-        except TeraboxNotFoundError:
-            _LOGGER.debug("Creating new folder: %s", self.backup_location)
-            res = await self._api.create_directory(self.backup_location)
+            # Only the first page is needed to know the folder exists
+            async for _ in self.async_iter_directory(path):
+                break
+        except TeraboxNotFound:
+            _LOGGER.debug("Creating new folder: %s", path)
+            res = await self._call("create_directory", path)
             _LOGGER.debug("Created folder: %s", res)
             return str(res['fs_id']), res['path']
-        return '', self.backup_location
+        return '', path
+
+    async def _async_upload_bytes(self, data: bytes, file_path: str) -> dict:
+        """Upload in-memory content to a remote file."""
+        import aiofiles
+
+        async with aiofiles.tempfile.NamedTemporaryFile() as tmpfile:
+            await tmpfile.write(data)
+            await tmpfile.flush()
+            return await self._call("upload_file", tmpfile.name, file_path)
 
     async def async_upload_backup(
         self,
         open_stream: Callable[[], Coroutine[Any, Any, AsyncIterator[bytes]]],
         backup: AgentBackup,
+        *,
+        stripe_to: list[TeraboxClient] | None = None,
+        replaces: tuple[TeraboxClient, BackupMetadata] | None = None,
+    ) -> None:
+        """Upload a backup.
+
+        :param stripe_to: Accounts to spread volumes over, volume mode only.
+        :param replaces: Account and remote backup with the same ID, it is
+            set aside during the upload and deleted once the upload is verified.
+        """
+        if replaces is None:
+            await self._async_upload_backup(open_stream, backup, stripe_to)
+            return
+        owner, metadata = replaces
+        try:
+            replaced = await owner.async_set_aside_backup(metadata)
+        except TeraboxNotFound:
+            # Deleted since the upload was queued
+            await self._async_upload_backup(open_stream, backup, stripe_to)
+            return
+        try:
+            await self._async_upload_backup(open_stream, backup, stripe_to)
+        except BaseException:
+            await owner.async_restore_backup(replaced)
+            raise
+        try:
+            await owner.async_delete_backups([replaced])
+        except (HomeAssistantError, TimeoutError) as err:
+            _LOGGER.warning(
+                "Failed to delete replaced backup %s: %s", backup.backup_id, err
+            )
+
+    async def _async_upload_backup(
+        self,
+        open_stream: Callable[[], Coroutine[Any, Any, AsyncIterator[bytes]]],
+        backup: AgentBackup,
+        stripe_to: list[TeraboxClient] | None,
     ) -> None:
-        """Upload a backup."""
         folder_id, _ = await self.async_create_ha_root_folder_if_not_exists()
 
+        iterator = await open_stream()
+        if self.storage_mode == STORAGE_MODE_DEDUP:
+            async with self._chunks_lock:
+                metadata = await self._async_upload_chunks(iterator, backup)
+        elif self.storage_mode == STORAGE_MODE_VOLUMES:
+            metadata = await self._async_upload_volumes(
+                iterator, backup, stripe_to or [self]
+            )
+        else:
+            metadata = await self._async_upload_single_file(iterator, backup)
+
+        _LOGGER.debug("Writing backup metadata for %s", backup.backup_id)
+        metadata_file = f"{self.backup_location}/.{backup.backup_id}.metadata.json"
+        await self._async_upload_bytes(json.dumps(metadata).encode(), metadata_file)
+        self._metadata_cache.pop(metadata_file, None)
+
+    async def _async_upload_single_file(
+        self,
+        iterator: AsyncIterator[bytes],
+        backup: AgentBackup,
+    ) -> dict[str, Any]:
+        """Upload a backup as a single remote file and return its metadata."""
+        import aiofiles
+        from homeassistant.components.backup import suggested_filename
+
         file_name = suggested_filename(backup)
         file_path = f"{self.backup_location}/{file_name}"
-        iterator = await open_stream()
         _LOGGER.debug("Uploading backup to %s", file_path)
+        md5 = hashlib.md5()
+        size = 0
         async with aiofiles.tempfile.NamedTemporaryFile(suffix=file_name) as tmpfile:
             async for b in iterator:
+                md5.update(b)
+                size += len(b)
                 await tmpfile.write(b)
             await tmpfile.flush()
             await tmpfile.seek(0)
             _LOGGER.debug("%s to %s", tmpfile.name, file_path)
             try:
-                upload_details = await self._api.upload_file(
+                upload_details = await self._call(
+                    "upload_file",
                     tmpfile.name,
                     file_path,
                 )
             except TimeoutError:
                 raise HomeAssistantError(f"Timeout while uploading backup: {file_path}")
         real_uploaded_path = upload_details['path']
+        await self._verify_uploaded_file(real_uploaded_path, size, md5.hexdigest())
 
-        _LOGGER.debug("Writing backup metadata for %s", real_uploaded_path)
-        metadata: dict[str, str | dict[str, list[str]]] = {
+        return {
             "file_path": real_uploaded_path,
             "metadata": backup.as_dict(),
+            "size": size,
+            "md5": md5.hexdigest(),
         }
-        async with aiofiles.tempfile.NamedTemporaryFile(suffix='.json') as tmpfile:
-            await tmpfile.write(json.dumps(metadata).encode())
-            await tmpfile.flush()
-            await tmpfile.seek(0)
-            await self._api.upload_file(
-                tmpfile.name,
-                f"{self.backup_location}/.{backup.backup_id}.metadata.json",
+
+    async def _async_upload_chunks(
+        self,
+        iterator: AsyncIterator[bytes],
+        backup: AgentBackup,
+    ) -> dict[str, Any]:
+        """Upload the chunks of a backup missing in the chunk store.
+
+        Return backup metadata with the recipe to rebuild the backup.
+        """
+        await self._async_create_folder_if_not_exists(self.chunks_location)
+        known = {
+            file.name
+            async for file in self.async_iter_directory(
+                self.chunks_location, _is_file
             )
+        }
+        chunker = ContentDefinedChunker()
+        md5 = hashlib.md5()
+        size = 0
+        uploaded = 0
+        recipe: list[str] = []
 
-        # Save cookies, it usually changes after upload
-        if self.config_entry:
-            options = dict(self.config_entry.options or {})
-            if options != dict(self._api._cookies):
-                options.update(self._api._cookies)
-            self.hass.config_entries.async_update_entry(self.config_entry, options=options)
+        async def store(chunk: bytes) -> None:
+            nonlocal uploaded
+            digest = chunk_digest(chunk)
+            recipe.append(digest)
+            if digest in known:
+                return
+            chunk_path = f"{self.chunks_location}/{digest}"
+            details = await self._async_upload_bytes(chunk, chunk_path)
+            if details['path'] != chunk_path:
+                # Chunk appeared concurrently and Terabox renamed our copy
+                await self.async_delete([details['path']])
+            else:
+                await self._verify_uploaded_file(
+                    chunk_path, len(chunk), hashlib.md5(chunk).hexdigest()
+                )
+                uploaded += len(chunk)
+            known.add(digest)
+
+        async for b in iterator:
+            md5.update(b)
+            size += len(b)
+            # Rolling hash is CPU bound, keep it off the event loop
+            for chunk in await self.hass.async_add_executor_job(chunker.update, b):
+                await store(chunk)
+        if (chunk := chunker.flush()) is not None:
+            await store(chunk)
+
+        _LOGGER.debug(
+            "Backup %s: %d chunks, uploaded %d of %d bytes",
+            backup.backup_id,
+            len(recipe),
+            uploaded,
+            size,
+        )
+        return {
+            "file_path": "",
+            "metadata": backup.as_dict(),
+            "size": size,
+            "md5": md5.hexdigest(),
+            "storage_mode": STORAGE_MODE_DEDUP,
+            "chunks": recipe,
+        }
+
+    async def _async_upload_volumes(
+        self,
+        iterator: AsyncIterator[bytes],
+        backup: AgentBackup,
+        clients: list[TeraboxClient],
+    ) -> dict[str, Any]:
+        """Upload a backup as fixed-size volumes and return its manifest.
+
+        The stream is spooled to one temp file per volume, finished volumes
+        upload in the background while the next one is being written.
+        Volumes are assigned to clients round-robin.
+        """
+        import aiofiles
+
+        semaphore = asyncio.Semaphore(_VOLUME_CONCURRENCY * len(clients))
+        tasks: list[asyncio.Task[dict[str, Any]]] = []
+        md5 = hashlib.md5()
+        size = 0
+
+        async with aiofiles.tempfile.TemporaryDirectory() as tmpdir:
+
+            async def upload(index: int, local_path: str, part_size: int, part_md5: str) -> dict[str, Any]:
+                try:
+                    client = clients[index % len(clients)]
+                    folder = client.volumes_location(backup.backup_id)
+                    remote_path = f"{folder}/part-{index:04d}"
+                    await client._async_upload_file_with_retry(
+                        local_path, remote_path, part_size, part_md5
+                    )
+                    volume = {"path": remote_path, "size": part_size, "md5": part_md5}
+                    if client is not self:
+                        volume["account"] = client.account_key
+                    return volume
+                finally:
+                    await asyncio.to_thread(os.unlink, local_path)
+                    semaphore.release()
+
+            try:
+                for client in clients:
+                    await client.async_create_ha_root_folder_if_not_exists()
+                    await client._async_create_folder_if_not_exists(
+                        client.volumes_location(backup.backup_id)
+                    )
+                buffer = b""
+                index = 0
+                eof = False
+                while not eof:
+                    # Limits the number of spooled volumes waiting for upload
+                    await semaphore.acquire()
+                    # Don't spool the rest of the stream once a volume failed
+                    for task in tasks:
+                        if task.done() and task.exception() is not None:
+                            await task
+                    local_path = os.path.join(tmpdir, f"part-{index:04d}")
+                    part_md5 = hashlib.md5()
+                    part_size = 0
+                    # Volumes list their own size, it may change between them
+                    volume_size = self.volume_upload_size.value
+                    async with aiofiles.open(local_path, "wb") as part:
+                        while part_size < volume_size:
+                            if not buffer:
+                                try:
+                                    buffer = await anext(iterator)
+                                except StopAsyncIteration:
+                                    eof = True
+                                    break
+                            data = buffer[:volume_size - part_size]
+                            buffer = buffer[len(data):]
+                            await part.write(data)
+                            part_md5.update(data)
+                            md5.update(data)
+                            part_size += len(data)
+                    if part_size == 0 and index > 0:
+                        await asyncio.to_thread(os.unlink, local_path)
+                        semaphore.release()
+                        break
+                    tasks.append(
+                        asyncio.create_task(
+                            upload(index, local_path, part_size, part_md5.hexdigest())
+                        )
+                    )
+                    size += part_size
+                    index += 1
+                volumes = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                # Without metadata nothing would ever delete uploaded volumes
+                await self._async_delete_volume_folders(backup.backup_id, clients)
+                raise
+
+        _LOGGER.debug("Backup %s uploaded as %d volumes", backup.backup_id, len(volumes))
+        return {
+            "file_path": "",
+            "metadata": backup.as_dict(),
+            "size": size,
+            "md5": md5.hexdigest(),
+            "storage_mode": STORAGE_MODE_VOLUMES,
+            "volumes": volumes,
+        }
+
+    async def _async_delete_volume_folders(
+        self, backup_id: str, clients: list[TeraboxClient]
+    ) -> None:
+        """Delete volumes of a failed upload, on a best effort basis."""
+        results = await asyncio.gather(
+            *(
+                client.async_delete([client.volumes_location(backup_id)])
+                for client in clients
+            ),
+            return_exceptions=True,
+        )
+        for client, result in zip(clients, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning(
+                    "Failed to delete volumes of backup %s from %s: %s",
+                    backup_id,
+                    client.account_key,
+                    result,
+                )
+
+    async def _async_upload_file_with_retry(
+        self, local_path: str, remote_path: str, size: int, md5: str
+    ) -> None:
+        """Upload and verify a local file, retrying it on its own on failure."""
+        for attempt in range(1, _VOLUME_MAX_ATTEMPTS + 1):
+            started = time.monotonic()
+            try:
+                details = await self._call("upload_file", local_path, remote_path)
+                if details['path'] != remote_path:
+                    # Leftover of a previous attempt, replace it
+                    await self.async_delete([remote_path])
+                    await self._call(
+                        "rename_file",
+                        details['path'],
+                        os.path.basename(remote_path),
+                    )
+                await self._verify_uploaded_file(remote_path, size, md5)
+            except (HomeAssistantError, ClientError, TimeoutError) as err:
+                self.volume_upload_size.record_error()
+                if attempt == _VOLUME_MAX_ATTEMPTS:
+                    raise
+                _LOGGER.warning(
+                    "Retrying upload of %s after %s, attempt %d/%d",
+                    remote_path,
+                    err,
+                    attempt,
+                    _VOLUME_MAX_ATTEMPTS,
+                )
+                await asyncio.sleep(attempt)
+            else:
+                self.volume_upload_size.record(size, time.monotonic() - started)
+                self.volume_upload_size.record_success()
+                return
+
+    async def _verify_uploaded_file(self, file_path: str, size: int, md5: str) -> None:
+        """Check the remote size and MD5 of an uploaded file."""
+        metas = await self._call("get_files_meta", [file_path])
+        if not metas:
+            raise HomeAssistantError(f"Uploaded file not found: {file_path}")
+        remote = metas[0]
+        if int(remote.get('size', -1)) != size:
+            await self.async_delete([file_path])
+            raise HomeAssistantError(
+                f"Size mismatch after upload of {file_path}: "
+                f"expected {size}, got {remote.get('size')}"
+            )
+        if size <= _SINGLE_BLOCK_MAX_SIZE and remote.get('md5') and remote['md5'] != md5:
+            await self.async_delete([file_path])
+            raise HomeAssistantError(
+                f"MD5 mismatch after upload of {file_path}: "
+                f"expected {md5}, got {remote['md5']}"
+            )
+        _LOGGER.debug("Verified %s: %d bytes, md5 %s", file_path, size, md5)
 
     async def async_list_backups(self) -> list[AgentBackup]:
         """List backups."""
+        from homeassistant.components.backup import AgentBackup
+
         try:
-            file_infos = await self._api.list_remote_directory(self.backup_location)
-        except TeraboxApiError as err:
+            return [
+                AgentBackup.from_dict(metadata.metadata)
+                async for metadata in self.async_iter_metadata()
+            ]
+        except TeraboxError as err:
             _LOGGER.error("Failed to list backups: %s", err)
-            file_infos = []
-
-        backups = []
-        metadatas = []
-        for file in file_infos:
-            if file.path.endswith(".metadata.json"):
-                metadatas.append(file.path)
-        if metadatas:
-            meta = await self._api.get_files_meta(metadatas)
-            for file in meta:
-                async with self._session.get(file['dlink']) as resp:
-                    metadata = BackupMetadata(
-                        **(await resp.json(content_type=None)),
-                        metadata_file=file['path'],
-                    )
-                    backups.append(AgentBackup.from_dict(metadata.metadata))
-        return backups
+            return []
+
+    async def async_iter_metadata(self) -> AsyncIterator[BackupMetadata]:
+        """Iterate over metadata of all backups in the backup location.
+
+        Only metadata files missing in the cache are downloaded, files
+        deleted after the listing are skipped.
+        """
+        try:
+            paths = [
+                file.path
+                async for file in self.async_iter_directory(
+                    self.backup_location, _is_metadata_file
+                )
+            ]
+        except TeraboxNotFound:
+            # Nothing was uploaded yet
+            self._metadata_cache.clear()
+            return
+        async for metadata in self._async_iter_metadata_files(paths):
+            yield metadata
+        # Forget backups deleted outside of Home Assistant
+        for path in self._metadata_cache.keys() - set(paths):
+            del self._metadata_cache[path]
+
+    async def _async_iter_metadata_files(
+        self, paths: list[str], *, skip_missing: bool = True
+    ) -> AsyncIterator[BackupMetadata]:
+        """Iterate over metadata files, downloading the ones not cached."""
+        batch: list[str] = []
+        for path in paths:
+            if path in self._metadata_cache:
+                yield self._metadata_cache[path]
+                continue
+            batch.append(path)
+            if len(batch) == _FILES_META_BATCH:
+                for metadata in await self._async_load_metadata_batch(
+                    batch, skip_missing=skip_missing
+                ):
+                    yield metadata
+                batch = []
+        for metadata in await self._async_load_metadata_batch(
+            batch, skip_missing=skip_missing
+        ):
+            yield metadata
+
+    async def _async_load_metadata_batch(
+        self, paths: list[str], *, skip_missing: bool = True
+    ) -> list[BackupMetadata]:
+        """Download metadata files.
+
+        :raises TeraboxNotFound: if a file is gone and skip_missing is not set.
+        """
+        if not paths:
+            return []
+        try:
+            files = await self._call("get_files_meta", paths)
+        except TeraboxNotFound:
+            if not skip_missing:
+                raise
+            # A single deleted file fails the whole batch, resolve one by one
+            files = []
+            for path in paths:
+                try:
+                    files.extend(await self._call("get_files_meta", [path]))
+                except TeraboxNotFound:
+                    _LOGGER.debug("Metadata file %s was deleted", path)
+        result = []
+        for file in files:
+            async with self._session.get(file['dlink']) as resp:
+                metadata = BackupMetadata(
+                    **(await resp.json(content_type=None)),
+                    metadata_file=file['path'],
+                )
+            self._metadata_cache[metadata.metadata_file] = metadata
+            result.append(metadata)
+        return result
+
+    async def async_warm_up(self, count: int) -> None:
+        """Load the backup catalog and download links of the newest backups.
+
+        Runs in the background after start, so the first backup page load
+        and restore don't wait for Terabox. Failures are only logged.
+        """
+        try:
+            catalog = [metadata async for metadata in self.async_iter_metadata()]
+            catalog.sort(key=lambda item: str(item.metadata.get('date', '')), reverse=True)
+            for metadata in catalog[:count]:
+                if metadata.storage_mode != STORAGE_MODE_FILE:
+                    continue
+                await asyncio.sleep(_WARM_UP_DELAY)
+                await self.async_get_file_url(metadata)
+        except (HomeAssistantError, ClientError, TimeoutError) as err:
+            _LOGGER.debug("Failed to warm up backup catalog: %s", err)
+            return
+        _LOGGER.debug("Warmed up catalog of %d backups", len(catalog))
 
     async def async_get_size_of_all_backups(self) -> int:
-        """Get size of all backups."""
-        backups = await self.async_list_backups()
+        """Get size of all backups.
 
-        return sum(backup.size for backup in backups)
+        Unlike async_list_backups, listing errors are raised, a failed
+        listing must not count as no backups.
+        """
+        return sum(
+            int(metadata.metadata['size'])
+            async for metadata in self.async_iter_metadata()
+        )
 
     async def _load_metadata(self, backup_id: str) -> BackupMetadata:
         # Test for metadata file existence.
         metadata_file = (
             f"{self.backup_location}/.{backup_id}.metadata.json"
         )
+        if metadata_file in self._metadata_cache:
+            return self._metadata_cache[metadata_file]
         try:
-            res = await self._api.get_files_meta([metadata_file])
-        except TeraboxNotFoundError:
+            res = await self._call("get_files_meta", [metadata_file])
+        except TeraboxNotFound:
             raise FileNotFoundError(
                 f"Metadata file not found at remote location: {metadata_file}"
             )
 
         async with self._session.get(res[0]['dlink']) as resp:
             content = await resp.json(content_type=None)
-            return BackupMetadata(
+            metadata = BackupMetadata(
                 **content,
                 metadata_file=metadata_file
             )
+        self._metadata_cache[metadata_file] = metadata
+        return metadata
+
+    async def async_get_backup_metadata(self, backup_id: str) -> BackupMetadata:
+        """Get metadata of a backup.
+
+        :raises FileNotFoundError: if the backup doesn't exist.
+        """
+        return await self._load_metadata(backup_id)
 
     async def async_get_backup_file_url(self, backup_id: str) -> tuple[str | None, BackupMetadata | None]:
         """Get file_id of backup if it exists."""
 
         metadata: BackupMetadata = await self._load_metadata(backup_id)
+        if metadata.storage_mode in (STORAGE_MODE_DEDUP, STORAGE_MODE_VOLUMES):
+            # Deduplicated and split backups have no single file to download
+            return None, metadata
+
+        file_url = await self.async_get_file_url(metadata)
+        if file_url is None:
+            return None, None
+        return file_url, metadata
 
-        metas = await self._api.get_files_meta([metadata.file_path])
+    async def async_get_file_url(self, metadata: BackupMetadata) -> str | None:
+        """Get download link of a single file backup."""
+        cached = self._dlink_cache.get(metadata.file_path)
+        if cached and time.monotonic() - cached[1] < _DLINK_TTL:
+            return cached[0]
+        metas = await self._call("get_files_meta", [metadata.file_path])
         # fs_ids = [str(file['fs_id']) for file in metas]
         # links = await self._api.download_file(fs_ids)
         for file in metas:
-            return str(file['dlink']), metadata
-        return None, None
+            self._dlink_cache[metadata.file_path] = (str(file['dlink']), time.monotonic())
+            return str(file['dlink'])
+        return None
+
+    async def async_open_file(self, metadata: BackupMetadata) -> ClientResponse | None:
+        """Start downloading a single file backup."""
+        if (file_url := await self.async_get_file_url(metadata)) is None:
+            return None
+        try:
+            return await self.async_download(file_url, metadata.size)
+        except ClientResponseError as err:
+            _LOGGER.debug("Download link rejected (%s), resolving it again", err.status)
+        # Cached link may expire earlier than expected
+        self._dlink_cache.pop(metadata.file_path, None)
+        if (file_url := await self.async_get_file_url(metadata)) is None:
+            return None
+        return await self.async_download(file_url, metadata.size)
 
     async def async_delete(self, file_paths: list[str]) -> None:
         """Delete file."""
-        await self._api.delete_files(file_paths)
+        await self._call("delete_files", file_paths)
+        for path in file_paths:
+            self._metadata_cache.pop(path, None)
+            self._dlink_cache.pop(path, None)
+
+    async def async_delete_backup(self, metadata: BackupMetadata) -> None:
+        """Delete a backup and chunks no other backup refers to."""
+        await self.async_delete_backups([metadata])
+
+    async def async_delete_backups(self, backups: list[BackupMetadata]) -> None:
+        """Delete backups with one delete request per account and batch.
+
+        Chunks are collected once after all deduplicated backups are gone.
+        """
+        # account key -> remote paths
+        paths: dict[str, list[str]] = {self.account_key: []}
+        dedup = []
+        for metadata in backups:
+            if metadata.storage_mode == STORAGE_MODE_VOLUMES:
+                for account_key, folder in self._volume_folders(metadata).items():
+                    paths.setdefault(account_key, []).append(folder)
+                paths[self.account_key].append(metadata.metadata_file)
+            elif metadata.storage_mode == STORAGE_MODE_DEDUP:
+                dedup.append(metadata.metadata_file)
+            else:
+                paths[self.account_key].extend([metadata.file_path, metadata.metadata_file])
+
+        # Metadata goes last, a failure never leaves volumes without a manifest
+        for account_key in sorted(paths, key=lambda key: key == self.account_key):
+            account_paths = paths[account_key]
+            client = self._client_for_account(account_key)
+            for start in range(0, len(account_paths), _FILES_META_BATCH):
+                await client.async_delete(account_paths[start:start + _FILES_META_BATCH])
+        if not dedup:
+            return
+        async with self._chunks_lock:
+            for start in range(0, len(dedup), _FILES_META_BATCH):
+                await self.async_delete(dedup[start:start + _FILES_META_BATCH])
+            await self._async_collect_garbage()
+
+    def _volume_folders(self, metadata: BackupMetadata) -> dict[str, str]:
+        """Return the volume folders of a backup by account key."""
+        backup_id = str(metadata.metadata['backup_id'])
+        suffix = ""
+        if metadata.metadata_file.endswith(_REPLACED_SUFFIX):
+            suffix = _REPLACED_SUFFIX
+        # Volumes of a striped backup live in other accounts too
+        return {
+            account_key: self._client_for_account(account_key).volumes_location(
+                backup_id
+            ) + suffix
+            for account_key in {self.account_key} | {
+                volume['account']
+                for volume in metadata.volumes or []
+                if volume.get('account')
+            }
+        }
+
+    async def _async_rename_backup(
+        self, metadata: BackupMetadata, suffix: str, new_suffix: str
+    ) -> BackupMetadata:
+        """Change the suffix of the metadata file and volume folders."""
+        renamed = replace(
+            metadata,
+            metadata_file=metadata.metadata_file.removesuffix(suffix) + new_suffix,
+        )
+        folders = []
+        try:
+            if metadata.storage_mode == STORAGE_MODE_VOLUMES:
+                for account_key, folder in self._volume_folders(renamed).items():
+                    client = self._client_for_account(account_key)
+                    await client._call(
+                        "rename_file",
+                        folder.removesuffix(new_suffix) + suffix,
+                        os.path.basename(folder),
+                    )
+                    folders.append((client, folder))
+            # The backup is listed under the old name until the metadata moves
+            await self._call(
+                "rename_file",
+                metadata.metadata_file,
+                os.path.basename(renamed.metadata_file),
+            )
+        except BaseException:
+            for client, folder in folders:
+                try:
+                    await client._call(
+                        "rename_file",
+                        folder,
+                        os.path.basename(folder.removesuffix(new_suffix) + suffix),
+                    )
+                except (HomeAssistantError, ClientError, TimeoutError) as err:
+                    _LOGGER.warning("Failed to rename %s back: %s", folder, err)
+            raise
+        self._metadata_cache.pop(metadata.metadata_file, None)
+        return renamed
+
+    async def async_set_aside_backup(self, metadata: BackupMetadata) -> BackupMetadata:
+        """Move a backup out of the way of an upload with the same ID.
+
+        The backup is no longer listed. Delete the returned backup with
+        async_delete_backups once the new upload is verified, or move it
+        back with async_restore_backup.
+        """
+        return await self._async_rename_backup(metadata, "", _REPLACED_SUFFIX)
+
+    async def async_restore_backup(self, metadata: BackupMetadata) -> BackupMetadata:
+        """Move back a backup set aside by async_set_aside_backup."""
+        return await self._async_rename_backup(metadata, _REPLACED_SUFFIX, "")
+
+    async def async_list_replaced_backups(self) -> list[BackupMetadata]:
+        """Return backups set aside by replacements, ongoing or interrupted."""
+        try:
+            paths = [
+                file.path
+                async for file in self.async_iter_directory(
+                    self.backup_location, _is_replaced_metadata_file
+                )
+            ]
+        except TeraboxNotFound:
+            return []
+        return [metadata async for metadata in self._async_iter_metadata_files(paths)]
 
-    async def async_download(self, file_url: str) -> ClientResponse:
-        """Download a file in chunks."""
+    async def _async_collect_garbage(self) -> None:
+        """Delete chunks that are not referenced by any backup."""
+        referenced: set[str] = set()
+        # Listing errors must propagate or stop here, otherwise chunks of
+        # unlisted backups look stale
+        try:
+            # Backups set aside for a replacement may still be restored
+            paths = [
+                file.path
+                async for file in self.async_iter_directory(
+                    self.backup_location,
+                    lambda file: _is_metadata_file(file)
+                    or _is_replaced_metadata_file(file),
+                )
+            ]
+            async for metadata in self._async_iter_metadata_files(
+                paths, skip_missing=False
+            ):
+                referenced.update(metadata.chunks or [])
+        except TeraboxNotFound:
+            # A metadata file may have been renamed, the listing is incomplete
+            _LOGGER.debug("Backups changed while collecting chunks, skipping it")
+            return
+        try:
+            # Collect first, deleting while paginating would shift the pages
+            stale = [
+                file.path
+                async for file in self.async_iter_directory(
+                    self.chunks_location,
+                    lambda file: not file.is_dir and file.name not in referenced,
+                )
+            ]
+        except TeraboxNotFound:
+            return
+        _LOGGER.debug("Deleting %d unreferenced chunks", len(stale))
+        for start in range(0, len(stale), _FILES_META_BATCH):
+            await self.async_delete(stale[start:start + _FILES_META_BATCH])
 
-        resp = await self._session.get(
+    async def _async_request_download(
+        self, file_url: str, headers: dict[str, str] | None = None
+    ) -> ClientResponse:
+        """Send a download request with the session cookies."""
+        return await self._session.get(
             file_url,
             cookies=self._api.request_cookies,
             headers={
                 "Accept-Encoding": "identity",
                 "Referer": "https://www.terabox.com/",
+                **(headers or {}),
             },
         )
-        resp.raise_for_status()
+
+    async def _async_open_download(self, file_url: str) -> ClientResponse:
+        resp = await self._async_request_download(file_url)
+        try:
+            resp.raise_for_status()
+        except ClientResponseError:
+            resp.release()
+            raise
         return resp
 
+    async def async_download(self, file_url: str, size: int | None = None) -> ClientResponse:
+        """Download a file in chunks.
+
+        Large files are downloaded from the fastest known host, the original
+        host of the link is used if that one fails.
+        """
+        if size is None or size < _FAST_HOST_MIN_SIZE:
+            return await self._async_open_download(file_url)
+        fast_url = await self.download_hosts.async_select(file_url)
+        if fast_url != file_url:
+            try:
+                return await self._async_open_download(fast_url)
+            except ClientError as err:
+                _LOGGER.debug("Fastest download host failed (%s), using the link host", err)
+                self.download_hosts.record_failure(fast_url)
+        return await self._async_open_download(file_url)
+
+    async def async_iter_chunks(self, metadata: BackupMetadata) -> AsyncIterator[bytes]:
+        """Rebuild a deduplicated backup from the chunk store."""
+        recipe = metadata.chunks or []
+        for start in range(0, len(recipe), _FILES_META_BATCH):
+            batch = recipe[start:start + _FILES_META_BATCH]
+            # Resolve dlinks per batch, they expire during long restores
+            metas = await self._call(
+                "get_files_meta",
+                [f"{self.chunks_location}/{digest}" for digest in dict.fromkeys(batch)]
+            )
+            dlinks = {file['server_filename']: str(file['dlink']) for file in metas}
+            for digest in batch:
+                if digest not in dlinks:
+                    raise HomeAssistantError(f"Backup chunk {digest} is missing")
+                resp = await self.async_download(dlinks[digest])
+                try:
+                    chunk = await resp.read()
+                finally:
+                    resp.release()
+                if chunk_digest(chunk) != digest:
+                    raise HomeAssistantError(f"Backup chunk {digest} is corrupted")
+                yield chunk
+
+    async def async_iter_volumes(self, metadata: BackupMetadata) -> AsyncIterator[bytes]:
+        """Stream the volumes of a backup in order.
+
+        Upcoming volumes are downloaded to temp files in parallel while the
+        current one is being streamed.
+        """
+        import aiofiles
+
+        volumes = metadata.volumes or []
+        clients = [self._client_for_account(volume.get('account')) for volume in volumes]
+        window = _VOLUME_CONCURRENCY * max(1, len(set(map(id, clients))))
+        async with aiofiles.tempfile.TemporaryDirectory() as tmpdir:
+            tasks: dict[int, asyncio.Task[str]] = {}
+
+            def schedule(index: int) -> None:
+                if index < len(volumes):
+                    tasks[index] = asyncio.create_task(
+                        clients[index]._async_download_volume(volumes[index], tmpdir)
+                    )
+
+            try:
+                for index in range(window):
+                    schedule(index)
+                for index in range(len(volumes)):
+                    local_path = await tasks.pop(index)
+                    schedule(index + window)
+                    async with aiofiles.open(local_path, "rb") as part:
+                        while chunk := await part.read(_READ_CHUNK_SIZE):
+                            yield chunk
+                    await asyncio.to_thread(os.unlink, local_path)
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def _async_download_volume(self, volume: dict[str, Any], tmpdir: str) -> str:
+        """Download and verify a single volume, retrying it on its own."""
+        import aiofiles
+
+        remote_path = volume['path']
+        local_path = os.path.join(tmpdir, os.path.basename(remote_path))
+        for attempt in range(1, _VOLUME_MAX_ATTEMPTS + 1):
+            try:
+                # Resolve the dlink right before use, it expires
+                metas = await self._call("get_files_meta", [remote_path])
+                resp = await self.async_download(str(metas[0]['dlink']), volume['size'])
+                md5 = hashlib.md5()
+                size = 0
+                started = time.monotonic()
+                try:
+                    async with aiofiles.open(local_path, "wb") as part:
+                        while True:
+                            # Time only the read, not the disk write
+                            read_started = time.monotonic()
+                            chunk = await async_read_chunk(
+                                resp, self.download_chunk_size.value
+                            )
+                            if not chunk:
+                                break
+                            self.download_chunk_size.record(
+                                len(chunk), time.monotonic() - read_started
+                            )
+                            md5.update(chunk)
+                            size += len(chunk)
+                            await part.write(chunk)
+                finally:
+                    resp.release()
+                if size != volume['size'] or md5.hexdigest() != volume['md5']:
+                    raise HomeAssistantError(f"Volume {remote_path} is corrupted")
+                # Spooling to disk doesn't wait for the consumer, so the
+                # duration is the speed of the host
+                self.download_hosts.record(
+                    str((resp.history[0] if resp.history else resp).url),
+                    size,
+                    time.monotonic() - started,
+                )
+                self.download_chunk_size.record_success()
+            except TeraboxNotFound as err:
+                raise HomeAssistantError(f"Volume {remote_path} is missing") from err
+            except (HomeAssistantError, ClientError, TimeoutError) as err:
+                self.download_chunk_size.record_error()
+                if attempt == _VOLUME_MAX_ATTEMPTS:
+                    raise
+                _LOGGER.warning(
+                    "Retrying download of %s after %s, attempt %d/%d",
+                    remote_path,
+                    err,
+                    attempt,
+                    _VOLUME_MAX_ATTEMPTS,
+                )
+                await asyncio.sleep(attempt)
+            else:
+                return local_path
+        raise HomeAssistantError(f"Failed to download {remote_path}")
+
     # async def async_download_to_file(self, file_url: str, aiofile: Any) -> None:
     #     """Download a file in chunks.
     #     I couldn't find a better way to stream download with aioterabox,
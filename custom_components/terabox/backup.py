@@ -2,23 +2,35 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
+import time
 from collections.abc import AsyncIterator, Callable, Coroutine
 from typing import Any
 
-from aioterabox.exceptions import TeraboxApiError
+from aiohttp import ClientError, ClientResponse
 from homeassistant.components.backup import (
     AgentBackup,
     BackupAgent,
     BackupAgentError,
     BackupNotFound,
 )
+from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.util import slugify
 
 from . import DATA_BACKUP_AGENT_LISTENERS, TeraboxConfigEntry
-from .const import DOMAIN
+from .api import BackupMetadata, TeraboxClient, async_read_chunk
+from .const import (
+    CONF_POOL,
+    DOMAIN,
+    POOL_AGENT_ID,
+    STORAGE_MODE_DEDUP,
+    STORAGE_MODE_VOLUMES,
+)
+from .tuning import AdaptiveSize
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,9 +39,23 @@ async def async_get_backup_agents(
     hass: HomeAssistant,
     **kwargs: Any,
 ) -> list[BackupAgent]:
-    """Return a list of backup agents."""
-    entries = hass.config_entries.async_loaded_entries(DOMAIN)
-    return [TeraboxBackupAgent(entry) for entry in entries]
+    """Return a list of backup agents.
+
+    The pool agent is built from every configured pooled entry, so it stays
+    in place while one of its accounts is not loaded.
+    """
+    entries = hass.config_entries.async_entries(
+        DOMAIN, include_ignore=False, include_disabled=False
+    )
+    loaded = [entry for entry in entries if entry.state is ConfigEntryState.LOADED]
+    pooled = [entry for entry in entries if entry.data.get(CONF_POOL)]
+    if len(pooled) < 2:
+        return [TeraboxBackupAgent(entry) for entry in loaded]
+    agents: list[BackupAgent] = [
+        TeraboxBackupAgent(entry) for entry in loaded if entry not in pooled
+    ]
+    agents.append(TeraboxPoolBackupAgent(pooled))
+    return agents
 
 
 @callback
@@ -55,6 +81,27 @@ def async_register_backup_agents_listener(
     return remove_listener
 
 
+async def _iter_response(
+    resp: ClientResponse, chunk_size: AdaptiveSize
+) -> AsyncIterator[bytes]:
+    """Read a download response in chunks sized to the measured throughput."""
+    try:
+        while True:
+            # Time only the read, the consumer may be slower than the link
+            started = time.monotonic()
+            chunk = await async_read_chunk(resp, chunk_size.value)
+            if not chunk:
+                break
+            chunk_size.record(len(chunk), time.monotonic() - started)
+            yield chunk
+        chunk_size.record_success()
+    except (ClientError, TimeoutError):
+        chunk_size.record_error()
+        raise
+    finally:
+        resp.release()
+
+
 class TeraboxBackupAgent(BackupAgent):
     """Terabox backup agent."""
 
@@ -67,30 +114,48 @@ class TeraboxBackupAgent(BackupAgent):
         assert config_entry.unique_id
         self.name = config_entry.title
         self.unique_id = slugify(config_entry.unique_id)
+        self._config_entry = config_entry
         self._client = config_entry.runtime_data.client
+        self._upload_queue = config_entry.runtime_data.upload_queue
+
+    @property
+    def config_entries(self) -> list[TeraboxConfigEntry]:
+        """Return the config entries of the accounts behind the agent."""
+        return [self._config_entry]
+
+    @property
+    def clients(self) -> list[TeraboxClient]:
+        """Return the clients of the accounts behind the agent."""
+        return [self._client]
+
+    async def _async_client_for_backup(self, backup_id: str) -> TeraboxClient:
+        """Return the client of the account storing a backup."""
+        return self._client
 
     async def async_upload_backup(
         self,
         *,
         open_stream: Callable[[], Coroutine[Any, Any, AsyncIterator[bytes]]],
         backup: AgentBackup,
+        replaces: tuple[TeraboxClient, BackupMetadata] | None = None,
         **kwargs: Any,
     ) -> None:
         """Upload a backup.
 
         :param open_stream: A function returning an async iterator that yields bytes.
         :param backup: Metadata about the backup that should be uploaded.
+        :param replaces: Account and remote backup to replace once uploaded.
         """
         try:
-            await self._client.async_upload_backup(open_stream, backup)
-        except (TeraboxApiError, HomeAssistantError, TimeoutError) as err:
+            await self._upload_queue.async_upload(open_stream, backup, replaces=replaces)
+        except (HomeAssistantError, TimeoutError) as err:
             raise BackupAgentError(f"Failed to upload backup: {err or err.__class__}") from err
 
     async def async_list_backups(self, **kwargs: Any) -> list[AgentBackup]:
         """List backups."""
         try:
             return await self._client.async_list_backups()
-        except (TeraboxApiError, HomeAssistantError, TimeoutError) as err:
+        except (HomeAssistantError, TimeoutError) as err:
             raise BackupAgentError(f"Failed to list backups: {err}") from err
 
     async def async_get_backup(
@@ -117,26 +182,58 @@ class TeraboxBackupAgent(BackupAgent):
         """
         _LOGGER.debug("Downloading backup_id: %s", backup_id)
         try:
-            backup_url, _ = await self._client.async_get_backup_file_url(backup_id)
-            if not backup_url:
+            client = await self._async_client_for_backup(backup_id)
+            metadata = await client.async_get_backup_metadata(backup_id)
+            cache = client.download_cache if metadata.md5 else None
+            staging = None
+            if cache and (cached := await cache.async_get(backup_id, metadata.md5)):
+                source = cached
+            elif metadata.storage_mode == STORAGE_MODE_DEDUP:
+                source = client.async_iter_chunks(metadata)
+            elif metadata.storage_mode == STORAGE_MODE_VOLUMES:
+                source = client.async_iter_volumes(metadata)
+            elif resp := await client.async_open_file(metadata):
+                source = _iter_response(resp, client.download_chunk_size)
+            else:
                 raise BackupNotFound(f"Backup {backup_id} not found")
+            if cache and source is not cached and cache.accepts(metadata.size):
+                staging = cache.stage(backup_id, metadata.md5)
 
-            resp = await self._client.async_download(backup_url)
-
-            async def stream(r) -> AsyncIterator[bytes]:
+            async def stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+                md5 = hashlib.md5()
+                size = 0
                 try:
-                    while True:
-                        chunk = await r.content.read(1024 * 1024)
-                        if not chunk:
-                            break
+                    async for chunk in chunks:
+                        md5.update(chunk)
+                        size += len(chunk)
+                        if staging:
+                            await staging.write(chunk)
                         yield chunk
-                except (TeraboxApiError, HomeAssistantError, TimeoutError) as err1:
+                    # Backups uploaded before verification was added have no hash
+                    if metadata.size is not None and metadata.size != size:
+                        raise BackupAgentError(
+                            f"Backup {backup_id} size mismatch: "
+                            f"expected {metadata.size}, got {size}"
+                        )
+                    if metadata.md5 and metadata.md5 != md5.hexdigest():
+                        raise BackupAgentError(
+                            f"Backup {backup_id} is corrupted: MD5 mismatch"
+                        )
+                    if staging:
+                        await staging.commit()
+                except (HomeAssistantError, TimeoutError) as err1:
                     raise BackupAgentError(f"Failed to download backup: {err1}") from err1
                 finally:
-                    r.release()
+                    await chunks.aclose()
+                    if staging:
+                        await staging.close()
 
-            return stream(resp)
-        except (TeraboxApiError, HomeAssistantError, TimeoutError) as err:
+            return stream(source)
+        except BackupNotFound:
+            raise
+        except FileNotFoundError as err:
+            raise BackupNotFound(f"Backup {backup_id} not found") from err
+        except (HomeAssistantError, TimeoutError) as err:
             raise BackupAgentError(f"Failed to download backup: {err}") from err
 
     async def async_delete_backup(
@@ -151,12 +248,248 @@ class TeraboxBackupAgent(BackupAgent):
         _LOGGER.debug("Deleting backup_id: %s", backup_id)
         try:
             # get metadata and ensure backup exists
-            _, metadata = await self._client.async_get_backup_file_url(backup_id)
-            if metadata.file_path:
-                _LOGGER.debug("Deleting backup_path: %s", metadata.file_path)
-                await self._client.async_delete([metadata.file_path, metadata.metadata_file])
-                _LOGGER.debug("Deleted backup_path: %s", metadata.file_path)
+            client = await self._async_client_for_backup(backup_id)
+            metadata = await client.async_get_backup_metadata(backup_id)
+            if metadata.file_path or metadata.storage_mode in (
+                STORAGE_MODE_DEDUP,
+                STORAGE_MODE_VOLUMES,
+            ):
+                _LOGGER.debug("Deleting backup: %s", metadata.metadata_file)
+                await client.async_delete_backup(metadata)
+                _LOGGER.debug("Deleted backup: %s", metadata.metadata_file)
                 return
-        except (TeraboxApiError, HomeAssistantError, TimeoutError) as err:
+        except BackupNotFound:
+            raise
+        except FileNotFoundError as err:
+            raise BackupNotFound(f"Backup {backup_id} not found") from err
+        except (HomeAssistantError, TimeoutError) as err:
             raise BackupAgentError(f"Failed to delete backup: {err}") from err
         raise BackupNotFound(f"Backup {backup_id} not found")
+
+    async def async_sync_backups(
+        self,
+        local: dict[str, tuple[AgentBackup, BackupAgent]],
+        *,
+        protected: bool,
+        delete_orphans: bool = False,
+    ) -> dict[str, list[str]]:
+        """Mirror local backups to Terabox.
+
+        Backups missing remotely or stored with another size are uploaded,
+        remote backups missing locally are deleted when requested. A remote
+        backup is replaced only after the new upload is verified. Backups
+        the backup manager would encrypt or decrypt for the agent are
+        skipped, they are uploaded as stored locally. Backups left set aside
+        by an interrupted replacement are restored first.
+
+        :param local: Local backups and the agents storing them by backup ID.
+        :param protected: Whether the backup manager encrypts backups for the agent.
+        """
+        remote: dict[str, tuple[TeraboxClient, BackupMetadata]] = {}
+        replaced: list[tuple[TeraboxClient, BackupMetadata]] = []
+        for client in self.clients:
+            async for metadata in client.async_iter_metadata():
+                remote.setdefault(str(metadata.metadata['backup_id']), (client, metadata))
+            replaced.extend(
+                (client, metadata)
+                for metadata in await client.async_list_replaced_backups()
+            )
+
+        def is_queued(backup_id: str) -> bool:
+            return any(
+                client.config_entry.runtime_data.upload_queue.is_queued(backup_id)
+                for client in self.clients
+            )
+
+        for client, metadata in replaced:
+            backup_id = str(metadata.metadata['backup_id'])
+            if is_queued(backup_id):
+                # Its replacement is being uploaded
+                continue
+            if backup_id in remote:
+                _LOGGER.info("Deleting backup %s replaced before a restart", backup_id)
+                await client.async_delete_backups([metadata])
+            else:
+                _LOGGER.info("Restoring backup %s set aside before a restart", backup_id)
+                remote[backup_id] = (client, await client.async_restore_backup(metadata))
+        queued = {backup_id for backup_id in local if is_queued(backup_id)}
+
+        to_replace: dict[str, tuple[TeraboxClient, BackupMetadata]] = {}
+        to_upload: list[tuple[AgentBackup, BackupAgent]] = []
+        skipped = []
+        for backup_id, (backup, agent) in local.items():
+            if backup_id in queued:
+                continue
+            if backup_id in remote:
+                client, metadata = remote[backup_id]
+                # Sizes of an encrypted and a plain copy never match
+                if metadata.size in (None, backup.size) or (
+                    metadata.metadata.get('protected') != backup.protected
+                ):
+                    continue
+            if backup.protected != protected:
+                _LOGGER.warning(
+                    "Skipping backup %s, the backup manager changes its "
+                    "encryption for Terabox",
+                    backup_id,
+                )
+                skipped.append(backup_id)
+                continue
+            if backup_id in remote:
+                _LOGGER.warning(
+                    "Remote backup %s has size %s instead of %s, uploading it again",
+                    backup_id,
+                    metadata.size,
+                    backup.size,
+                )
+                to_replace[backup_id] = remote[backup_id]
+            to_upload.append((backup, agent))
+        orphans = [backup_id for backup_id in remote if backup_id not in local]
+        deleted = []
+        if delete_orphans:
+            to_delete: dict[TeraboxClient, list[BackupMetadata]] = {}
+            for backup_id in orphans:
+                client, metadata = remote[backup_id]
+                to_delete.setdefault(client, []).append(metadata)
+            # Free space before the uploads
+            for client, backups in to_delete.items():
+                await client.async_delete_backups(backups)
+            deleted.extend(orphans)
+
+        async def upload(backup: AgentBackup, agent: BackupAgent) -> None:
+            async def open_stream() -> AsyncIterator[bytes]:
+                return await agent.async_download_backup(backup.backup_id)
+
+            # Set aside when the upload starts, so it stays listed until then
+            await self.async_upload_backup(
+                open_stream=open_stream,
+                backup=backup,
+                replaces=to_replace.get(backup.backup_id),
+            )
+
+        # Queued at once, uploads run as parallel as the upload workers allow
+        results = await asyncio.gather(
+            *(upload(backup, agent) for backup, agent in to_upload),
+            return_exceptions=True,
+        )
+        uploaded = []
+        failed = []
+        for (backup, _), result in zip(to_upload, results):
+            if isinstance(result, BaseException):
+                _LOGGER.error("Failed to upload backup %s: %s", backup.backup_id, result)
+                failed.append(backup.backup_id)
+            else:
+                uploaded.append(backup.backup_id)
+        return {
+            "uploaded": uploaded,
+            "failed": failed,
+            "skipped": skipped,
+            "replaced": [backup_id for backup_id in uploaded if backup_id in to_replace],
+            "deleted": deleted,
+            "orphans": orphans,
+        }
+
+
+class TeraboxPoolBackupAgent(TeraboxBackupAgent):
+    """Backup agent spreading backups over several Terabox accounts."""
+
+    def __init__(self, config_entries: list[TeraboxConfigEntry]) -> None:
+        """Initialize the pool agent."""
+        BackupAgent.__init__(self)
+
+        self.name = "Terabox pool"
+        self.unique_id = POOL_AGENT_ID
+        self._config_entries = config_entries
+
+    @property
+    def config_entries(self) -> list[TeraboxConfigEntry]:
+        """Return the config entries of the pooled accounts."""
+        return self._config_entries
+
+    @property
+    def clients(self) -> list[TeraboxClient]:
+        """Return the clients of the pooled accounts.
+
+        Backups may be striped over all accounts, so the pool fails as a
+        whole while one of them is not loaded.
+        """
+        if unloaded := [
+            entry.title
+            for entry in self._config_entries
+            if entry.state is not ConfigEntryState.LOADED
+        ]:
+            raise BackupAgentError(
+                f"Terabox pool accounts not loaded: {', '.join(unloaded)}"
+            )
+        return [entry.runtime_data.client for entry in self._config_entries]
+
+    async def _async_free_space(self, client: TeraboxClient) -> float:
+        """Return free space of an account, unlimited accounts go first."""
+        quota = await client.async_get_storage_quota()
+        if quota.limit is None:
+            return float("inf")
+        return quota.limit - quota.usage
+
+    async def async_upload_backup(
+        self,
+        *,
+        open_stream: Callable[[], Coroutine[Any, Any, AsyncIterator[bytes]]],
+        backup: AgentBackup,
+        replaces: tuple[TeraboxClient, BackupMetadata] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Upload a backup to the account with the most free space.
+
+        Large backups in volume mode are striped over all accounts with room
+        for at least one volume.
+        """
+        try:
+            clients = self.clients
+            free = await asyncio.gather(
+                *(self._async_free_space(client) for client in clients)
+            )
+            ranked = sorted(zip(free, clients), key=lambda item: item[0], reverse=True)
+            primary = ranked[0][1]
+            stripe_to = None
+            if (
+                primary.storage_mode == STORAGE_MODE_VOLUMES
+                and backup.size > primary.volume_size
+            ):
+                stripe_to = [
+                    client for space, client in ranked if space >= primary.volume_size
+                ] or [primary]
+            _LOGGER.debug(
+                "Uploading backup %s to %s, striped over %d accounts",
+                backup.backup_id,
+                primary.account_key,
+                len(stripe_to or [primary]),
+            )
+            await primary.config_entry.runtime_data.upload_queue.async_upload(
+                open_stream, backup, stripe_to=stripe_to, replaces=replaces
+            )
+        except (HomeAssistantError, TimeoutError) as err:
+            raise BackupAgentError(f"Failed to upload backup: {err or err.__class__}") from err
+
+    async def async_list_backups(self, **kwargs: Any) -> list[AgentBackup]:
+        """List backups of all accounts in the pool."""
+        try:
+            results = await asyncio.gather(
+                *(client.async_list_backups() for client in self.clients)
+            )
+        except (HomeAssistantError, TimeoutError) as err:
+            raise BackupAgentError(f"Failed to list backups: {err}") from err
+        catalog: dict[str, AgentBackup] = {}
+        for backups in results:
+            for backup in backups:
+                catalog.setdefault(backup.backup_id, backup)
+        return list(catalog.values())
+
+    async def _async_client_for_backup(self, backup_id: str) -> TeraboxClient:
+        """Return the client of the account storing the backup metadata."""
+        for client in self.clients:
+            try:
+                await client.async_get_backup_metadata(backup_id)
+            except FileNotFoundError:
+                continue
+            return client
+        raise BackupNotFound(f"Backup {backup_id} not found")
@@ -0,0 +1,184 @@
+"""Local LRU cache of downloaded Terabox backups."""
+
+from __future__ import annotations
+
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+# Home Assistant and Supervisor backups skip tmp_backups/*.tar, files in
+# subfolders would be included, so cached files live in it with a prefix
+CACHE_FOLDER = "tmp_backups"
+
+
+def cache_prefix(entry_id: str) -> str:
+    """Return the file name prefix of cached backups of a config entry."""
+    return f"{DOMAIN}_cache.{entry_id}."
+
+
+def partial_prefix(entry_id: str) -> str:
+    """Return the file name prefix of downloads being cached.
+
+    Partial files end in .tar too, so backups skip them, but they have their
+    own prefix so they are never indexed as cached backups.
+    """
+    return f"{DOMAIN}_partial.{entry_id}."
+
+
+def remove_cache(directory: Path, entry_id: str) -> None:
+    """Delete cached backups of a config entry."""
+    if not directory.is_dir():
+        return
+    for prefix in (cache_prefix(entry_id), partial_prefix(entry_id)):
+        for path in directory.glob(f"{prefix}*"):
+            path.unlink(missing_ok=True)
+
+
+class TeraboxDownloadCache:
+    """Keep recently downloaded backups on local disk.
+
+    Files are keyed by backup ID and the verified MD5 of the backup, the
+    least recently used ones are evicted when the size cap is exceeded.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, max_size: int) -> None:
+        """Initialize the cache."""
+        self._hass = hass
+        self._entry_id = entry_id
+        self._directory = Path(hass.config.path(CACHE_FOLDER))
+        self._prefix = cache_prefix(entry_id)
+        self._partial_prefix = partial_prefix(entry_id)
+        self._max_size = max_size
+        # name -> size, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+
+    def _name(self, backup_id: str, md5: str) -> str:
+        return f"{self._prefix}{backup_id}.{md5}.tar"
+
+    async def async_load(self) -> None:
+        """Index files cached before a restart."""
+
+        def scan() -> list[tuple[str, int]]:
+            # Left by releases caching in the system temp folder
+            shutil.rmtree(
+                Path(tempfile.gettempdir()) / f"{DOMAIN}_cache" / self._entry_id, True
+            )
+            self._directory.mkdir(parents=True, exist_ok=True)
+            # Leftovers of interrupted downloads
+            for path in self._directory.glob(f"{self._partial_prefix}*"):
+                path.unlink(missing_ok=True)
+            files = []
+            for path in self._directory.glob(f"{self._prefix}*"):
+                if path.suffix != ".tar":
+                    # Partial file of an earlier release
+                    path.unlink(missing_ok=True)
+                    continue
+                stat = path.stat()
+                files.append((stat.st_mtime, path.name, stat.st_size))
+            return [(name, size) for _, name, size in sorted(files)]
+
+        self._entries = OrderedDict(await self._hass.async_add_executor_job(scan))
+        await self._async_evict()
+
+    @property
+    def size(self) -> int:
+        """Return the total size of cached backups."""
+        return sum(self._entries.values())
+
+    def accepts(self, size: int | None) -> bool:
+        """Return if a backup of this size fits into the cache."""
+        return size is not None and size <= self._max_size
+
+    async def async_get(self, backup_id: str, md5: str) -> AsyncIterator[bytes] | None:
+        """Return a stream of a cached backup, None on cache miss."""
+        name = self._name(backup_id, md5)
+        if name not in self._entries:
+            return None
+        self._entries.move_to_end(name)
+        path = self._directory / name
+        try:
+            await self._hass.async_add_executor_job(os.utime, path)
+        except FileNotFoundError:
+            del self._entries[name]
+            return None
+        _LOGGER.debug("Serving backup %s from local cache", backup_id)
+        return self._async_read(path)
+
+    async def _async_read(self, path: Path) -> AsyncIterator[bytes]:
+        import aiofiles
+
+        async with aiofiles.open(path, "rb") as file:
+            while chunk := await file.read(_READ_CHUNK_SIZE):
+                yield chunk
+
+    def stage(self, backup_id: str, md5: str) -> CacheStaging:
+        """Start caching a backup while it is being downloaded."""
+        return CacheStaging(self, self._name(backup_id, md5))
+
+    async def _async_commit(self, name: str, partial: Path) -> None:
+        size = (await self._hass.async_add_executor_job(partial.stat)).st_size
+        await self._hass.async_add_executor_job(
+            os.replace, partial, self._directory / name
+        )
+        self._entries[name] = size
+        self._entries.move_to_end(name)
+        await self._async_evict()
+
+    async def _async_evict(self) -> None:
+        while self._entries and self.size > self._max_size:
+            name, _ = self._entries.popitem(last=False)
+            _LOGGER.debug("Evicting %s from local cache", name)
+            await self._hass.async_add_executor_job(
+                (self._directory / name).unlink, True
+            )
+
+
+class CacheStaging:
+    """Partial file filled while a backup streams from Terabox."""
+
+    def __init__(self, cache: TeraboxDownloadCache, name: str) -> None:
+        """Initialize the staging file."""
+        self._cache = cache
+        self._name = name
+        # Unique name, the same backup may be downloaded twice at once
+        self._partial = (
+            cache._directory / f"{cache._partial_prefix}{secrets.token_hex(4)}.tar"
+        )
+        self._file = None
+
+    async def write(self, chunk: bytes) -> None:
+        """Append a chunk."""
+        import aiofiles
+
+        if self._file is None:
+            self._file = await aiofiles.open(self._partial, "wb")
+        await self._file.write(chunk)
+
+    async def commit(self) -> None:
+        """Add the staged backup to the cache after it was verified."""
+        if self._file is None:
+            return
+        await self._file.close()
+        self._file = None
+        await self._cache._async_commit(self._name, self._partial)
+
+    async def close(self) -> None:
+        """Drop the partial file unless it was committed."""
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+            await self._cache._hass.async_add_executor_job(self._partial.unlink, True)
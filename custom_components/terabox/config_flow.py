@@ -18,10 +18,21 @@ from . import TeraboxClient
 from .const import (
     CONF_BACKUP_LOCATION,
     CONF_BROWSERID,
+    CONF_CACHE_SIZE,
     CONF_CSRF_TOKEN,
     CONF_JSTOKEN,
     CONF_NDUS,
+    CONF_POOL,
+    CONF_STORAGE_MODE,
+    CONF_UPLOAD_WORKERS,
+    CONF_VOLUME_SIZE,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_UPLOAD_WORKERS,
+    DEFAULT_VOLUME_SIZE,
     DOMAIN,
+    MIN_VOLUME_SIZE,
+    STORAGE_MODE_FILE,
+    STORAGE_MODES,
 )
 
 DATA_SCHEMA = vol.Schema(
@@ -31,6 +42,17 @@ DATA_SCHEMA = vol.Schema(
             config=TextSelectorConfig(type=TextSelectorType.PASSWORD)
         ),
         vol.Optional(CONF_BACKUP_LOCATION): str,
+        vol.Optional(CONF_STORAGE_MODE, default=STORAGE_MODE_FILE): vol.In(STORAGE_MODES),
+        vol.Optional(CONF_VOLUME_SIZE, default=DEFAULT_VOLUME_SIZE): vol.All(
+            vol.Coerce(int), vol.Range(min=MIN_VOLUME_SIZE)
+        ),
+        vol.Optional(CONF_POOL, default=False): bool,
+        vol.Optional(CONF_CACHE_SIZE, default=DEFAULT_CACHE_SIZE): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_UPLOAD_WORKERS, default=DEFAULT_UPLOAD_WORKERS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=4)
+        ),
 
         vol.Optional(CONF_JSTOKEN): TextSelector(
             config=TextSelectorConfig(type=TextSelectorType.TEXT)
@@ -120,6 +142,13 @@ class TeraboxFlowHandler(ConfigFlow, domain=DOMAIN):
                     CONF_EMAIL: user_input[CONF_EMAIL],
                     CONF_PASSWORD: user_input[CONF_PASSWORD],
                     CONF_BACKUP_LOCATION: user_input.get(CONF_BACKUP_LOCATION, ""),
+                    CONF_STORAGE_MODE: user_input.get(CONF_STORAGE_MODE, STORAGE_MODE_FILE),
+                    CONF_VOLUME_SIZE: user_input.get(CONF_VOLUME_SIZE, DEFAULT_VOLUME_SIZE),
+                    CONF_POOL: user_input.get(CONF_POOL, False),
+                    CONF_CACHE_SIZE: user_input.get(CONF_CACHE_SIZE, DEFAULT_CACHE_SIZE),
+                    CONF_UPLOAD_WORKERS: user_input.get(
+                        CONF_UPLOAD_WORKERS, DEFAULT_UPLOAD_WORKERS
+                    ),
                 },
                 options=cookies,
             )
@@ -8,13 +8,53 @@ from typing import Final
 DOMAIN = "terabox"
 
 SCAN_INTERVAL = timedelta(hours=6)
+# A failed first refresh is retried sooner, doubling the delay up to the max
+FIRST_REFRESH_RETRY = timedelta(seconds=30)
+FIRST_REFRESH_MAX_RETRY = timedelta(minutes=30)
+# Newest backups to resolve download links for after start
+WARM_UP_BACKUPS = 3
 DRIVE_FOLDER_PREFIX = "hass_backup"
 
-STORAGE_KEY = "terraform_cookies"
+STORAGE_KEY = f"{DOMAIN}_cookies"
 STORAGE_VERSION = 1
+UPLOAD_QUEUE_STORAGE_KEY = f"{DOMAIN}_upload_queue"
+UPLOAD_QUEUE_STORAGE_VERSION = 1
+HISTORY_STORAGE_KEY = f"{DOMAIN}_usage_history"
+HISTORY_STORAGE_VERSION = 1
+
+# Fired when the quota is forecast to be full within QUOTA_WARNING_DAYS
+EVENT_QUOTA_FORECAST = f"{DOMAIN}_quota_forecast"
+QUOTA_WARNING_DAYS = 7
 
 CONF_BACKUP_LOCATION: Final = "backup_location"
 CONF_NDUS: Final = "ndus"
 CONF_CSRF_TOKEN: Final = "csrfToken"
 CONF_BROWSERID: Final = "browserid"
 CONF_JSTOKEN: Final = "jstoken"
+CONF_STORAGE_MODE: Final = "storage_mode"
+CONF_VOLUME_SIZE: Final = "volume_size"
+CONF_POOL: Final = "pool"
+CONF_CACHE_SIZE: Final = "cache_size"
+CONF_UPLOAD_WORKERS: Final = "upload_workers"
+
+POOL_AGENT_ID = "pool"
+
+STORAGE_MODE_FILE: Final = "file"
+STORAGE_MODE_DEDUP: Final = "dedup"
+STORAGE_MODE_VOLUMES: Final = "volumes"
+STORAGE_MODES: Final = (STORAGE_MODE_FILE, STORAGE_MODE_DEDUP, STORAGE_MODE_VOLUMES)
+
+DEFAULT_VOLUME_SIZE = 1024  # MiB
+MIN_VOLUME_SIZE = 16  # MiB
+DEFAULT_CACHE_SIZE = 0  # MiB, disabled
+DEFAULT_UPLOAD_WORKERS = 1
+
+CHUNKS_FOLDER = ".chunks"
+
+# Mirror domains serving the same download links, probed for the fastest host
+DOWNLOAD_DOMAINS: Final = (
+    "terabox.com",
+    "1024terabox.com",
+    "teraboxapp.com",
+    "terabox.app",
+)
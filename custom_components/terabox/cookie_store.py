@@ -0,0 +1,45 @@
+"""Persistent storage of rotated Terabox session cookies."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import STORAGE_KEY, STORAGE_VERSION
+
+# Cookies rotate on most uploads, coalesce them into a single write
+COOKIES_SAVE_DELAY = 30
+
+
+class TeraboxCookieStore:
+    """Keep session cookies of a config entry in a dedicated store."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the cookie store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry_id}", private=True
+        )
+        self._cookies: dict[str, Any] | None = None
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Load saved cookies."""
+        self._cookies = await self._store.async_load()
+        return self._cookies
+
+    @callback
+    def async_save_if_changed(self, cookies: dict[str, Any]) -> None:
+        """Schedule a write when the cookies differ from the saved ones."""
+        if cookies == self._cookies:
+            return
+        self._cookies = dict(cookies)
+        self._store.async_delay_save(self._data_to_save, COOKIES_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return self._cookies or {}
+
+    async def async_remove(self) -> None:
+        """Remove saved cookies."""
+        await self._store.async_remove()
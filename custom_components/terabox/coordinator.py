@@ -2,16 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
-from aioterabox.exceptions import TeraboxApiError
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
 from .api import StorageQuotaData, TeraboxClient
-from .const import DOMAIN, SCAN_INTERVAL
+from .const import (
+    DOMAIN,
+    EVENT_QUOTA_FORECAST,
+    FIRST_REFRESH_MAX_RETRY,
+    FIRST_REFRESH_RETRY,
+    QUOTA_WARNING_DAYS,
+    SCAN_INTERVAL,
+)
+from .exceptions import TeraboxError
+from .forecast import UsageForecast, UsageHistory
+from .upload_queue import TeraboxUploadQueue, UploadQueueStatus
 
 type TeraboxConfigEntry = ConfigEntry[TeraboxDataUpdateCoordinator]
 
@@ -24,12 +36,16 @@ class SensorData:
 
     storage_quota: StorageQuotaData
     all_backups_size: int
+    upload_queue: UploadQueueStatus
+    forecast: UsageForecast
 
 
 class TeraboxDataUpdateCoordinator(DataUpdateCoordinator[SensorData]):
     """Class to manage fetching Terabox data from single endpoint."""
 
     client: TeraboxClient
+    upload_queue: TeraboxUploadQueue
+    usage_history: UsageHistory
     config_entry: TeraboxConfigEntry
     email_address: str
     backup_folder_id: str
@@ -39,11 +55,16 @@ class TeraboxDataUpdateCoordinator(DataUpdateCoordinator[SensorData]):
         hass: HomeAssistant,
         *,
         client: TeraboxClient,
+        upload_queue: TeraboxUploadQueue,
+        usage_history: UsageHistory,
         backup_location: str,
         config_entry: TeraboxConfigEntry,
     ) -> None:
         """Initialize Terabox data updater."""
         self.client = client
+        self.upload_queue = upload_queue
+        self.usage_history = usage_history
+        self._quota_warned = False
         self.account_id = client.account_id
         self.backup_location = backup_location
 
@@ -54,24 +75,78 @@ class TeraboxDataUpdateCoordinator(DataUpdateCoordinator[SensorData]):
             name=DOMAIN,
             update_interval=SCAN_INTERVAL,
         )
+        config_entry.async_on_unload(
+            upload_queue.async_add_listener(self._async_upload_queue_changed)
+        )
 
-    async def _async_setup(self) -> None:
-        """Do initialization logic."""
-        await self.client.login()
+    @callback
+    def _async_upload_queue_changed(self) -> None:
+        """Push queue changes without polling Terabox."""
+        if self.data is None:
+            return
+        self.data = replace(self.data, upload_queue=self.upload_queue.status)
+        self.async_update_listeners()
+
+    async def async_initial_refresh(self) -> None:
+        """Refresh after setup, retrying with backoff until Terabox answers.
+
+        Setup doesn't wait for it, so it can't be retried by the config entry.
+        """
+        delay = FIRST_REFRESH_RETRY
+        while True:
+            await self.async_refresh()
+            if self.last_update_success or isinstance(
+                self.last_exception, ConfigEntryAuthFailed
+            ):
+                return
+            _LOGGER.debug("Retrying first refresh in %s", delay)
+            await asyncio.sleep(delay.total_seconds())
+            delay = min(delay * 2, FIRST_REFRESH_MAX_RETRY)
 
     async def _async_update_data(self) -> SensorData:
         """Fetch data from Terabox."""
         try:
             storage_quota = await self.client.async_get_storage_quota()
             all_backups_size = await self.client.async_get_size_of_all_backups()
-            return SensorData(
-                storage_quota=storage_quota,
-                all_backups_size=all_backups_size,
-            )
-        except TeraboxApiError as error:
+        except TeraboxError as error:
             _LOGGER.exception('Failed to update data from Terabox API')
             raise UpdateFailed(
                 translation_domain=DOMAIN,
                 translation_key="invalid_response_terabox_error",
                 translation_placeholders={"error": str(error)},
             ) from error
+        self.usage_history.async_add(
+            dt_util.utcnow().timestamp(), storage_quota.usage, all_backups_size
+        )
+        forecast = self.usage_history.forecast(storage_quota.limit)
+        self._async_check_forecast(storage_quota, forecast)
+        return SensorData(
+            storage_quota=storage_quota,
+            all_backups_size=all_backups_size,
+            upload_queue=self.upload_queue.status,
+            forecast=forecast,
+        )
+
+    @callback
+    def _async_check_forecast(
+        self, storage_quota: StorageQuotaData, forecast: UsageForecast
+    ) -> None:
+        """Fire an event once the quota is forecast to run out soon."""
+        running_out = (
+            forecast.days_until_full is not None
+            and forecast.days_until_full <= QUOTA_WARNING_DAYS
+        )
+        if running_out and not self._quota_warned:
+            assert storage_quota.limit is not None
+            self.hass.bus.async_fire(
+                EVENT_QUOTA_FORECAST,
+                {
+                    "config_entry_id": self.config_entry.entry_id,
+                    "account_id": self.account_id,
+                    "days_until_full": forecast.days_until_full,
+                    "free": storage_quota.limit - storage_quota.usage,
+                    "usage_growth": forecast.usage_growth,
+                    "backups_growth": forecast.backups_growth,
+                },
+            )
+        self._quota_warned = running_out
@@ -0,0 +1,45 @@
+"""Diagnostics support for Terabox."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_BROWSERID, CONF_CSRF_TOKEN, CONF_JSTOKEN, CONF_NDUS
+from .coordinator import TeraboxConfigEntry
+
+TO_REDACT = {
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    CONF_NDUS,
+    CONF_CSRF_TOKEN,
+    CONF_BROWSERID,
+    CONF_JSTOKEN,
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: TeraboxConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data
+    client = coordinator.client
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "transfer_sizes": {
+            "download_chunk": client.download_chunk_size.as_dict(),
+            "upload_volume": client.volume_upload_size.as_dict(),
+        },
+        "download_hosts": {
+            host: asdict(score) for host, score in client.download_hosts.scores.items()
+        },
+        "upload_queue": asdict(coordinator.upload_queue.status),
+        "data": asdict(coordinator.data) if coordinator.data else None,
+    }
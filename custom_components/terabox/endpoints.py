@@ -0,0 +1,174 @@
+"""Selection of the fastest Terabox download host."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+
+from aiohttp import ClientError, ClientResponse
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bytes requested from every host by a probe
+PROBE_SIZE = 256 * 1024
+PROBE_TIMEOUT = 10
+# Scores older than this are refreshed by a new probe
+PROBE_TTL = 60 * 60
+# Weight of the last measurement in the host scores
+_SMOOTHING = 0.3
+# Hosts failing this many times in a row are skipped until the next probe
+_MAX_FAILURES = 2
+
+RangeRequest = Callable[[str, dict[str, str]], Awaitable[ClientResponse]]
+
+
+@dataclass
+class HostScore:
+    """Class to represent measured speed of a download host."""
+
+    latency: float | None = None
+    throughput: float | None = None
+    failures: int = 0
+
+    def update(self, latency: float | None, size: int, duration: float) -> None:
+        """Add a successful measurement."""
+        self.failures = 0
+        if latency is not None:
+            self.latency = _smooth(self.latency, latency)
+        if size > 0 and duration > 0:
+            self.throughput = _smooth(self.throughput, size / duration)
+
+    @property
+    def usable(self) -> bool:
+        """Return if the host answered recently."""
+        return self.throughput is not None and self.failures < _MAX_FAILURES
+
+
+def _smooth(current: float | None, value: float) -> float:
+    if current is None:
+        return value
+    return current + _SMOOTHING * (value - current)
+
+
+def replace_host(url: str, host: str) -> str:
+    """Return the URL pointing at another host, the path and signature are kept."""
+    return urlunsplit(urlsplit(url)._replace(netloc=host))
+
+
+class DownloadHostSelector:
+    """Keep latency and throughput scores of download hosts.
+
+    Candidates are the hosts seen in download links plus the same host name
+    under the mirror domains. Candidates are probed with small Range requests,
+    large downloads are then sent to the host with the best throughput.
+    """
+
+    def __init__(
+        self,
+        request: RangeRequest,
+        *,
+        domains: Iterable[str] = (),
+        probe_size: int = PROBE_SIZE,
+    ) -> None:
+        """Initialize the selector."""
+        self._request = request
+        self._domains = tuple(domains)
+        self._probe_size = probe_size
+        self._scores: dict[str, HostScore] = {}
+        self._probed_at: float | None = None
+        self._probe_lock = asyncio.Lock()
+
+    @property
+    def scores(self) -> dict[str, HostScore]:
+        """Return the scores of all known hosts."""
+        return self._scores
+
+    def add_hosts(self, hosts: Iterable[str]) -> None:
+        """Add candidate hosts, e.g. taken from download links."""
+        for host in hosts:
+            self._scores.setdefault(host, HostScore())
+
+    def candidates(self, url: str) -> list[str]:
+        """Return candidate hosts for a download link."""
+        host = urlsplit(url).netloc
+        hosts = [host]
+        if (name := host.split(".", 1)[0]) and "." in host:
+            hosts.extend(f"{name}.{domain}" for domain in self._domains)
+        hosts.extend(self._scores)
+        return list(dict.fromkeys(hosts))
+
+    def best_host(self) -> str | None:
+        """Return the host with the highest throughput."""
+        usable = [
+            (score.throughput, host)
+            for host, score in self._scores.items()
+            if score.usable
+        ]
+        return max(usable)[1] if usable else None
+
+    async def async_select(self, url: str) -> str:
+        """Return the download link rewritten to the fastest host."""
+        self.add_hosts([urlsplit(url).netloc])
+        async with self._probe_lock:
+            if (
+                self._probed_at is None
+                or time.monotonic() - self._probed_at > PROBE_TTL
+                or self.best_host() is None
+            ):
+                await self.async_probe(url)
+        if (host := self.best_host()) is None:
+            return url
+        return replace_host(url, host)
+
+    async def async_probe(self, url: str) -> None:
+        """Measure all candidate hosts with a Range request for the link."""
+        hosts = self.candidates(url)
+        await asyncio.gather(*(self._async_probe_host(url, host) for host in hosts))
+        self._probed_at = time.monotonic()
+        _LOGGER.debug(
+            "Download host scores: %s",
+            {
+                host: round(score.throughput or 0)
+                for host, score in self._scores.items()
+            },
+        )
+
+    async def _async_probe_host(self, url: str, host: str) -> None:
+        score = self._scores.setdefault(host, HostScore())
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(PROBE_TIMEOUT):
+                resp = await self._request(
+                    replace_host(url, host),
+                    {"Range": f"bytes=0-{self._probe_size - 1}"},
+                )
+                try:
+                    resp.raise_for_status()
+                    latency = time.monotonic() - started
+                    # Hosts ignoring Range would send the whole file
+                    size = 0
+                    while size < self._probe_size and (
+                        chunk := await resp.content.read(self._probe_size - size)
+                    ):
+                        size += len(chunk)
+                finally:
+                    resp.release()
+        except (ClientError, TimeoutError) as err:
+            _LOGGER.debug("Probe of download host %s failed: %s", host, err)
+            self.record_failure(host)
+            return
+        score.update(latency, size, time.monotonic() - started)
+
+    def record(self, url: str, size: int, duration: float) -> None:
+        """Add the speed of a finished download to the score of its host."""
+        score = self._scores.setdefault(urlsplit(url).netloc, HostScore())
+        score.update(None, size, duration)
+
+    def record_failure(self, url_or_host: str) -> None:
+        """Mark a failed request, the host drops out after repeated failures."""
+        host = urlsplit(url_or_host).netloc or url_or_host
+        self._scores.setdefault(host, HostScore()).failures += 1
@@ -0,0 +1,13 @@
+"""Exceptions for the Terabox integration."""
+
+from __future__ import annotations
+
+from homeassistant.exceptions import HomeAssistantError
+
+
+class TeraboxError(HomeAssistantError):
+    """Terabox API call failed."""
+
+
+class TeraboxNotFound(TeraboxError):
+    """Remote file or folder doesn't exist."""
@@ -0,0 +1,93 @@
+"""Rolling history and growth forecast of Terabox storage usage."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import HISTORY_STORAGE_KEY, HISTORY_STORAGE_VERSION
+
+_DAY = 24 * 3600
+# Samples older than this don't describe the current backup schedule
+HISTORY_WINDOW = 30 * _DAY
+# Refreshes closer than this replace the last sample
+_MIN_SAMPLE_INTERVAL = 3600
+# Fitting needs samples spread over at least this period
+_MIN_FIT_SPAN = _DAY
+
+
+@dataclass
+class UsageForecast:
+    """Class to represent the storage usage forecast."""
+
+    backups_growth: float | None
+    usage_growth: float | None
+    days_until_full: float | None
+
+
+def _slope(points: list[tuple[float, float]]) -> float:
+    """Return the least squares slope of the points."""
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return cov / var
+
+
+class UsageHistory:
+    """Keep samples of quota usage and backup size in a store.
+
+    Samples are ``[timestamp, usage, backups_size]`` lists, one per hour at
+    most and only for the last ``HISTORY_WINDOW``.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the history."""
+        self._store = self._create_store(hass, entry_id)
+        self._samples: list[list[int]] = []
+
+    @staticmethod
+    def _create_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+        return Store(
+            hass, HISTORY_STORAGE_VERSION, f"{HISTORY_STORAGE_KEY}.{entry_id}"
+        )
+
+    @classmethod
+    async def async_remove(cls, hass: HomeAssistant, entry_id: str) -> None:
+        """Remove the history of a removed config entry."""
+        await cls._create_store(hass, entry_id).async_remove()
+
+    async def async_load(self) -> None:
+        """Load samples saved before the restart."""
+        data = await self._store.async_load() or {}
+        self._samples = data.get("samples", [])
+
+    @callback
+    def async_add(self, timestamp: float, usage: int, backups_size: int) -> None:
+        """Add a sample and drop the ones out of the window."""
+        sample = [int(timestamp), usage, backups_size]
+        if self._samples and timestamp - self._samples[-1][0] < _MIN_SAMPLE_INTERVAL:
+            self._samples[-1] = sample
+        else:
+            self._samples.append(sample)
+        self._samples = [s for s in self._samples if timestamp - s[0] <= HISTORY_WINDOW]
+        self._store.async_delay_save(self._data_to_save, 60)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"samples": self._samples}
+
+    def forecast(self, limit: int | None) -> UsageForecast:
+        """Fit growth per day and predict when the quota is full."""
+        samples = self._samples
+        if len(samples) < 2 or samples[-1][0] - samples[0][0] < _MIN_FIT_SPAN:
+            return UsageForecast(None, None, None)
+        backups_growth = _slope([(s[0], s[2]) for s in samples]) * _DAY
+        usage_growth = _slope([(s[0], s[1]) for s in samples]) * _DAY
+        days_until_full = None
+        if limit is not None and usage_growth > 0:
+            days_until_full = max(0.0, (limit - samples[-1][1]) / usage_growth)
+        return UsageForecast(backups_growth, usage_growth, days_until_full)
@@ -9,8 +9,9 @@ from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
+    SensorStateClass,
 )
-from homeassistant.const import EntityCategory, UnitOfInformation
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.typing import StateType
@@ -67,6 +68,44 @@ SENSORS: tuple[TeraboxSensorEntityDescription, ...] = (
         value_fn=lambda data: data.all_backups_size,
         entity_registry_enabled_default=False,
     ),
+    TeraboxSensorEntityDescription(
+        key="upload_queue_depth",
+        translation_key="upload_queue_depth",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda data: data.upload_queue.depth,
+    ),
+    TeraboxSensorEntityDescription(
+        key="upload_queue_eta",
+        translation_key="upload_queue_eta",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_unit_of_measurement=UnitOfTime.MINUTES,
+        suggested_display_precision=0,
+        device_class=SensorDeviceClass.DURATION,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda data: data.upload_queue.eta,
+    ),
+    TeraboxSensorEntityDescription(
+        key="days_until_full",
+        translation_key="days_until_full",
+        native_unit_of_measurement=UnitOfTime.DAYS,
+        suggested_display_precision=0,
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=lambda data: data.forecast.days_until_full,
+        exists_fn=lambda data: data.storage_quota.limit is not None,
+    ),
+    TeraboxSensorEntityDescription(
+        key="backups_growth",
+        translation_key="backups_growth",
+        native_unit_of_measurement="MiB/d",
+        suggested_display_precision=1,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda data: (
+            None
+            if data.forecast.backups_growth is None
+            else data.forecast.backups_growth / 1024 / 1024
+        ),
+    ),
 )
 
 
@@ -77,10 +116,11 @@ async def async_setup_entry(
 ) -> None:
     """Set up Terabox sensor based on a config entry."""
     coordinator = entry.runtime_data
+    # The first refresh may still be running, then add all sensors
     async_add_entities(
         TeraboxSensorEntity(coordinator, description)
         for description in SENSORS
-        if description.exists_fn(coordinator.data)
+        if coordinator.data is None or description.exists_fn(coordinator.data)
     )
 
 
@@ -99,6 +139,11 @@ class TeraboxSensorEntity(TeraboxEntity, SensorEntity):
         self.entity_description = description
         self._attr_unique_id = f"{coordinator.config_entry.unique_id}_{description.key}"
 
+    @property
+    def available(self) -> bool:
+        """Return if the sensor has data."""
+        return super().available and self.coordinator.data is not None
+
     @property
     def native_value(self) -> StateType:
         """Return the state of the sensor."""
@@ -0,0 +1,95 @@
+"""Services for the Terabox integration."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+from homeassistant.const import ATTR_CONFIG_ENTRY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.components.backup import AgentBackup, BackupAgent
+
+SERVICE_SYNC_BACKUPS = "sync_backups"
+ATTR_DELETE_ORPHANS = "delete_orphans"
+
+SYNC_BACKUPS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_DELETE_ORPHANS, default=False): cv.boolean,
+    }
+)
+
+
+async def _async_list_local_backups(
+    hass: HomeAssistant,
+) -> dict[str, tuple[AgentBackup, BackupAgent]]:
+    """Return backups of the local backup agents by backup ID."""
+    from homeassistant.components.backup import async_get_manager
+
+    backups: dict[str, tuple[AgentBackup, BackupAgent]] = {}
+    for agent in async_get_manager(hass).local_backup_agents.values():
+        for backup in await agent.async_list_backups():
+            backups.setdefault(backup.backup_id, (backup, agent))
+    return backups
+
+
+def _agent_protected(hass: HomeAssistant, agent_id: str) -> bool:
+    """Return whether the backup manager encrypts backups for an agent."""
+    from homeassistant.components.backup import async_get_manager
+
+    # Agents without settings get encrypted backups
+    if agent_config := async_get_manager(hass).config.data.agents.get(agent_id):
+        return agent_config.protected
+    return True
+
+
+async def _async_handle_sync_backups(call: ServiceCall) -> ServiceResponse:
+    """Mirror local backups to Terabox, one pass per backup agent."""
+    # Imported here, the backup integration is only needed by the service
+    from .backup import async_get_backup_agents
+
+    hass = call.hass
+    agents = await async_get_backup_agents(hass)
+    if entry_id := call.data.get(ATTR_CONFIG_ENTRY_ID):
+        agents = [
+            agent
+            for agent in agents
+            if any(entry.entry_id == entry_id for entry in agent.config_entries)
+        ]
+    if not agents:
+        raise ServiceValidationError("No loaded Terabox account to sync")
+
+    local = await _async_list_local_backups(hass)
+    results = {}
+    for agent in agents:
+        results[agent.agent_id] = await agent.async_sync_backups(
+            local,
+            protected=_agent_protected(hass, agent.agent_id),
+            delete_orphans=call.data[ATTR_DELETE_ORPHANS],
+        )
+        for entry in agent.config_entries:
+            await entry.runtime_data.async_request_refresh()
+    if failed := [
+        backup_id for result in results.values() for backup_id in result["failed"]
+    ]:
+        raise HomeAssistantError(
+            f"Failed to upload {len(failed)} backups: {', '.join(failed)}"
+        )
+    return results
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Terabox services."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SYNC_BACKUPS,
+        _async_handle_sync_backups,
+        schema=SYNC_BACKUPS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,93 @@
+"""Runtime tuning of transfer chunk sizes."""
+
+from __future__ import annotations
+
+from typing import Any
+
+# Weight of the last measurement in throughput and error rate
+_SMOOTHING = 0.3
+# Throughput of small reads is averaged over this period
+_WINDOW = 1.0
+
+
+class AdaptiveSize:
+    """Pick a transfer size from measured throughput and error rate.
+
+    The size aims at transfers lasting ``target_duration`` and shrinks with
+    the error rate, so a failed transfer costs less to retry. It is kept in
+    ``[minimum, maximum]`` and is a multiple of ``align``.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        align: int,
+        target_duration: float,
+    ) -> None:
+        """Initialize the size."""
+        self._minimum = minimum
+        self._maximum = max(minimum, maximum)
+        self._align = align
+        self._target_duration = target_duration
+        self._value = self._clamp(initial)
+        self._throughput: float | None = None
+        self._error_rate = 0.0
+        self._window_size = 0
+        self._window_duration = 0.0
+
+    @property
+    def value(self) -> int:
+        """Return the size to use for the next transfer."""
+        return self._value
+
+    def _clamp(self, size: float) -> int:
+        size = int(size) // self._align * self._align
+        return min(self._maximum, max(self._minimum, size))
+
+    def _update(self) -> None:
+        if self._throughput is None:
+            return
+        self._value = self._clamp(
+            self._throughput * self._target_duration * (1 - self._error_rate)
+        )
+
+    def record(self, size: int, duration: float) -> None:
+        """Add bytes transferred in the given time."""
+        self._window_size += size
+        self._window_duration += duration
+        if self._window_duration < _WINDOW:
+            return
+        throughput = self._window_size / self._window_duration
+        self._window_size = 0
+        self._window_duration = 0.0
+        if self._throughput is None:
+            self._throughput = throughput
+        else:
+            self._throughput += _SMOOTHING * (throughput - self._throughput)
+        self._update()
+
+    def record_success(self) -> None:
+        """Mark a finished transfer."""
+        self._error_rate -= _SMOOTHING * self._error_rate
+        self._update()
+
+    def record_error(self) -> None:
+        """Mark a failed transfer, the size shrinks right away."""
+        self._error_rate += _SMOOTHING * (1 - self._error_rate)
+        if self._throughput is None:
+            self._value = self._clamp(self._value * (1 - _SMOOTHING))
+        else:
+            self._update()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state for diagnostics."""
+        return {
+            "value": self._value,
+            "minimum": self._minimum,
+            "maximum": self._maximum,
+            "throughput": self._throughput,
+            "error_rate": round(self._error_rate, 3),
+        }
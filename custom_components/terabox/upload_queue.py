@@ -0,0 +1,283 @@
+"""Persistent queue of backup uploads to Terabox."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from collections.abc import AsyncIterator, Callable, Coroutine
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+
+from .const import UPLOAD_QUEUE_STORAGE_KEY, UPLOAD_QUEUE_STORAGE_VERSION
+
+if TYPE_CHECKING:
+    from homeassistant.components.backup import AgentBackup
+
+    from .api import TeraboxClient
+
+_LOGGER = logging.getLogger(__name__)
+
+# Live uploads have Home Assistant waiting for them, resumed ones don't
+PRIORITY_LIVE = 0
+PRIORITY_RESUMED = 1
+
+# Weight of the last upload in the throughput estimate
+_THROUGHPUT_SMOOTHING = 0.3
+
+
+@dataclass
+class UploadQueueStatus:
+    """Class to represent upload queue state."""
+
+    depth: int
+    eta: float | None
+
+
+@dataclass
+class _UploadJob:
+    backup: AgentBackup
+    open_stream: Callable[[], Coroutine[Any, Any, AsyncIterator[bytes]]]
+    priority: int
+    kwargs: dict[str, Any]
+    future: asyncio.Future[None] | None = None
+    task: asyncio.Task[None] | None = None
+
+
+class TeraboxUploadQueue:
+    """Run uploads of a Terabox account one at a time.
+
+    Queued backups are saved to a store, uploads interrupted by a restart
+    are resumed from the local backup agent once Home Assistant started.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: TeraboxClient,
+        entry_id: str,
+        *,
+        workers: int = 1,
+    ) -> None:
+        """Initialize the upload queue."""
+        self._hass = hass
+        self._client = client
+        self._workers = workers
+        self._store = self._create_store(hass, entry_id)
+        self._queue: asyncio.PriorityQueue[tuple[int, int, _UploadJob]] = (
+            asyncio.PriorityQueue()
+        )
+        self._counter = itertools.count()
+        # backup_id -> job, waiting and running
+        self._jobs: dict[str, _UploadJob] = {}
+        self._running: dict[str, float] = {}
+        self._throughput: float | None = None
+        self._listeners: list[Callable[[], None]] = []
+        self._saved_backups: list[dict[str, Any]] = []
+
+    @staticmethod
+    def _create_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+        return Store(
+            hass, UPLOAD_QUEUE_STORAGE_VERSION, f"{UPLOAD_QUEUE_STORAGE_KEY}.{entry_id}"
+        )
+
+    @classmethod
+    async def async_remove(cls, hass: HomeAssistant, entry_id: str) -> None:
+        """Remove queued uploads of a removed config entry."""
+        await cls._create_store(hass, entry_id).async_remove()
+
+    @property
+    def status(self) -> UploadQueueStatus:
+        """Return queue depth and estimated time to drain it."""
+        eta = None
+        if self._throughput:
+            now = time.monotonic()
+            pending = sum(job.backup.size for job in self._jobs.values())
+            # Bytes already sent by running uploads, by the current estimate
+            sent = sum(
+                min(
+                    (now - started) * self._throughput,
+                    self._jobs[backup_id].backup.size,
+                )
+                for backup_id, started in self._running.items()
+            )
+            eta = max(0.0, (pending - sent) / self._throughput / self._workers)
+        return UploadQueueStatus(depth=len(self._jobs), eta=eta)
+
+    def is_queued(self, backup_id: str) -> bool:
+        """Return if a backup is waiting for upload or being uploaded."""
+        return backup_id in self._jobs
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Listen for queue changes."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    async def async_load(self) -> None:
+        """Load uploads that didn't finish before the restart."""
+        data = await self._store.async_load() or {}
+        self._saved_backups = data.get("backups", [])
+
+    def start(self, create_task: Callable[[Coroutine[Any, Any, None], str], Any]) -> None:
+        """Start the workers with a task factory cancelled on unload."""
+        for index in range(self._workers):
+            create_task(self._async_worker(), f"terabox_upload_worker_{index}")
+
+    async def async_upload(
+        self,
+        open_stream: Callable[[], Coroutine[Any, Any, AsyncIterator[bytes]]],
+        backup: AgentBackup,
+        **kwargs: Any,
+    ) -> None:
+        """Queue an upload and wait until it is done."""
+        job = _UploadJob(
+            backup=backup,
+            open_stream=open_stream,
+            priority=PRIORITY_LIVE,
+            kwargs=kwargs,
+            future=self._hass.loop.create_future(),
+        )
+        self._put(job)
+        try:
+            await job.future
+        finally:
+            if not job.future.done():
+                # The caller gave up, its stream can't be read anymore
+                job.future.cancel()
+                if job.task is not None:
+                    job.task.cancel()
+                else:
+                    self._finish(job)
+
+    async def async_resume(self) -> None:
+        """Queue uploads interrupted by a restart.
+
+        The backups are read from the local backup agent, backups removed
+        from it in the meantime are skipped.
+        """
+        if not self._saved_backups:
+            return
+        from homeassistant.components.backup import AgentBackup, async_get_manager
+
+        manager = async_get_manager(self._hass)
+        for data in self._saved_backups:
+            backup = AgentBackup.from_dict(data)
+            if backup.backup_id in self._jobs:
+                continue
+            agent = None
+            for local_agent in manager.local_backup_agents.values():
+                try:
+                    await local_agent.async_get_backup(backup.backup_id)
+                except HomeAssistantError:
+                    continue
+                agent = local_agent
+                break
+            if agent is None:
+                _LOGGER.warning(
+                    "Backup %s is not available locally, skipping upload",
+                    backup.backup_id,
+                )
+                continue
+
+            async def open_stream(
+                agent: Any = agent, backup_id: str = backup.backup_id
+            ) -> AsyncIterator[bytes]:
+                return await agent.async_download_backup(backup_id)
+
+            _LOGGER.info("Resuming upload of backup %s", backup.backup_id)
+            self._put(
+                _UploadJob(
+                    backup=backup,
+                    open_stream=open_stream,
+                    priority=PRIORITY_RESUMED,
+                    kwargs={},
+                )
+            )
+        self._saved_backups = []
+        self._async_save()
+
+    def _put(self, job: _UploadJob) -> None:
+        self._jobs[job.backup.backup_id] = job
+        self._queue.put_nowait((job.priority, next(self._counter), job))
+        self._async_save()
+        self._notify()
+
+    async def _async_worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            backup_id = job.backup.backup_id
+            if job.future is not None and job.future.done():
+                # Cancelled while waiting
+                continue
+            self._running[backup_id] = started = time.monotonic()
+            self._notify()
+            # Separate task, so the waiting caller can cancel just this upload
+            job.task = asyncio.ensure_future(
+                self._client.async_upload_backup(
+                    job.open_stream, job.backup, **job.kwargs
+                )
+            )
+            try:
+                await asyncio.wait((job.task,))
+            except asyncio.CancelledError:
+                job.task.cancel()
+                if job.future is not None and not job.future.done():
+                    job.future.cancel()
+                # Unload or shutdown, the saved job is resumed after the restart
+                self._saved_backups.append(job.backup.as_dict())
+                self._finish(job)
+                raise
+            if job.task.cancelled():
+                pass
+            elif (err := job.task.exception()) is not None:
+                if job.future is None:
+                    _LOGGER.error("Failed to upload backup %s: %s", backup_id, err)
+                elif not job.future.done():
+                    job.future.set_exception(err)
+            else:
+                self._update_throughput(job.backup.size, time.monotonic() - started)
+                if job.future is not None and not job.future.done():
+                    job.future.set_result(None)
+            self._finish(job)
+
+    def _finish(self, job: _UploadJob) -> None:
+        if self._jobs.get(job.backup.backup_id) is not job:
+            return
+        del self._jobs[job.backup.backup_id]
+        self._running.pop(job.backup.backup_id, None)
+        self._async_save()
+        self._notify()
+
+    def _update_throughput(self, size: int, duration: float) -> None:
+        if duration <= 0 or size <= 0:
+            return
+        throughput = size / duration
+        if self._throughput is None:
+            self._throughput = throughput
+        else:
+            self._throughput += _THROUGHPUT_SMOOTHING * (throughput - self._throughput)
+
+    @callback
+    def _async_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, 1)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        backups = [job.backup.as_dict() for job in self._jobs.values()]
+        # Keep saved uploads that are not resumed yet
+        queued = {job.backup.backup_id for job in self._jobs.values()}
+        backups.extend(
+            data for data in self._saved_backups if data["backup_id"] not in queued
+        )
+        return {"backups": backups}
+
+    @callback
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            listener()